@@ -9,6 +9,7 @@ from sqlalchemy.orm import selectinload
 from sqlmodel import select
 
 from app.models.user import User
+from app.services.user_cache import CurrentUser, user_cache
 from app.database.session import get_session
 from app.utils.hashing import verify_password
 from app.utils.jwt import Token, TokenData, create_access_token, oauth2_scheme
@@ -25,11 +26,16 @@ async def get_user(session: SessionDep, username: str):
     return get_user
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
-                           session: SessionDep):
+                           session: SessionDep) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Not authorized",
     )
+    # token already verified recently: no JWT decode, no users query
+    cached = user_cache.get(token)
+    if cached is not None and cached.is_active:
+        return cached
+
     try:
         payload = jwt.decode(token, security_settings.JWT_SECRET, algorithms=[security_settings.JWT_ALGORITHM])
         username = payload.get("user", {}).get("name") #To avoid any key error used .get
@@ -44,7 +50,9 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
         raise credentials_exception
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+    current_user = CurrentUser.from_user(user)
+    user_cache.set(token, current_user, payload.get("exp"))
+    return current_user
 
 
 async def login_for_access_token(
@@ -69,5 +77,5 @@ async def login_for_access_token(
         }, expires_delta=access_token_expires)
     return Token(access_token=access_token, token_type="bearer")
 
-#Get authorized user
-UserDep = Annotated[User, Depends(get_current_user)]
\ No newline at end of file
+#Get authorized user (snapshot, not an ORM object)
+UserDep = Annotated[CurrentUser, Depends(get_current_user)]
\ No newline at end of file
@@ -1,10 +1,11 @@
 from fastapi import APIRouter
 
-from app.api.v1.routers import dashboard, organization, documents, ask
+from app.api.v1.routers import dashboard, organization, documents, ask, metrics
 
 master_router = APIRouter()
 
 master_router.include_router(dashboard.router)
 master_router.include_router(organization.router)
 master_router.include_router(documents.router)
-master_router.include_router(ask.router)
\ No newline at end of file
+master_router.include_router(ask.router)
+master_router.include_router(metrics.router)
\ No newline at end of file
@@ -1,86 +1,64 @@
+from typing import Optional
+from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel
-from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, model_validator
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.dependencies import SessionDep, UserDep
+from app.database.session import async_session_maker
 from app.models.ai_audit_logs import AIAuditLogs
-from app.models.organization import Organization
 from app.models.documents import Documents 
 from app.services.similarity_search import vector_search
-from app.llm.base import llm_call
-import re
+from app.services.embedder import embed_text
+from app.services.answer_cache import answer_cache_version, lookup_cached_answer, store_answer
+from app.services.audit_sink import audit_sink
+from app.services.organization_cache import organization_cache
+from app.services.user_cache import CurrentUser
+from app.llm.base import LLMUsage, llm_call, llm_stream
+import json
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
-def _extract_tokens_from_metadata(metadata: dict) -> dict:
-    """
-    Try common places first (usage or llm_output dict), else simple regex fallback on raw string.
-    Returns dict with keys input_tokens, output_tokens, total_tokens (values or None).
-    """
-    if not metadata:
-        return {"input_tokens": None, "output_tokens": None, "total_tokens": None, "model_name": None}
-
-    # common structured places
-    for key in ("usage", "llm_output", "response_metadata", "usage_metadata"):
-        part = metadata.get(key)
-        if isinstance(part, dict):
-            return {
-                "input_tokens": part.get("input_tokens") or part.get("input") or part.get("input_tokens_count"),
-                "output_tokens": part.get("output_tokens") or part.get("output") or part.get("output_tokens_count"),
-                "total_tokens": part.get("total_tokens") or part.get("total") or part.get("total_tokens_count"),
-                "model_name": part.get("model_name") or part.get("model"),
-            }
-
-    raw = metadata.get("raw", "") or ""
-
-    def _find_int(name: str):
-        m = re.search(rf"['\"]?{re.escape(name)}['\"]?\s*[:=]\s*(\d+)", raw)
-        return int(m.group(1)) if m else None
-
-    def _find_str(name: str):
-        # first try quoted string like model_name='gemini-2.5-flash'
-        m = re.search(rf"['\"]?{re.escape(name)}['\"]?\s*[:=]\s*['\"](?P<v>[^'\"]+)['\"]", raw)
-        if m:
-            return m.group("v")
-        # fallback: unquoted token
-        m = re.search(rf"{re.escape(name)}\s*[:=]\s*([^\s,}}]+)", raw)
-        return m.group(1) if m else None
-
-    return {
-        "input_tokens": _find_int("input_tokens"),
-        "output_tokens": _find_int("output_tokens"),
-        "total_tokens": _find_int("total_tokens"),
-        "model_name": _find_str("model_name")
-    }
-
 class AskRequest(BaseModel):
     question: str
-    organization: str
+    # organization name, or its id to skip the name lookup
+    organization: Optional[str] = None
+    organization_id: Optional[UUID] = None
 
+    @model_validator(mode="after")
+    def _organization_given(self):
+        if self.organization is None and self.organization_id is None:
+            raise ValueError("Either organization or organization_id is required.")
+        return self
 
-@router.post("/ask")
-async def ask_route(body: AskRequest, 
-                    session: SessionDep, 
-                    current_user: UserDep):
-    get_org = select(Organization.id).where(Organization.organization_name == body.organization)
-    result = await session.execute(get_org)
-    org_record = result.scalar_one_or_none()  # Gets the first match or None; raises if multiple matches
-    
+
+NO_DOCUMENTS_ANSWER = "I don't know (no indexed documents for your organisation)."
+
+
+async def _resolve_organization(session: AsyncSession, body: AskRequest, current_user: CurrentUser) -> UUID:
+    if body.organization_id is not None:
+        # the caller's own organization is known to exist: no query at all
+        if body.organization_id == current_user.organization_id or await organization_cache.exists(session, body.organization_id):
+            return body.organization_id
+        raise HTTPException(status_code=404, detail=f"Organization '{body.organization_id}' not found.")
+
+    org_record = await organization_cache.id_for_name(session, body.organization)
     if org_record is None:
         raise HTTPException(status_code=404, detail=f"Organization '{body.organization}' not found.")
-    
-    org_id = str(org_record)  # Convert UUID to string for vector_search
-    
-    if org_id is None:  # This shouldn't happen after the query, but for safety
-        raise HTTPException(status_code=400, detail="Invalid organization.")
+    return org_record
 
-    vector_results = await vector_search(org_id=org_id, query=body.question, session=session)
 
-    if not vector_results:
-        return {"answer": "I don't know (no indexed documents for your organisation)."}
+async def _embed_question(question: str):
+    try:
+        return await embed_text(question)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Embedding service timed out, please try again.")
+
 
+def _build_prompt(vector_results: list, question: str):
+    """Returns (prompt, sources) for the retrieved chunks."""
     # build sources list (keep traceable metadata like page, source, chunk id)
     sources = []
     context_pieces = []
@@ -99,39 +77,142 @@ async def ask_route(body: AskRequest,
             "distance": result.get("distance"),
             "snippet": snippet,
         })
-        
+
     system = ("You are a helpful assistant. Answer ONLY using the CONTEXT below. "
               "If the answer is not present, say: 'I don't know; please contact support.'")
-    prompt = f"{system}\n\nCONTEXT:\n\n" + "\n\n---\n\n".join(context_pieces) + f"\n\nQUESTION:\n{body.question}"
-
-    llm_result = await llm_call(prompt)
-    # text to return to client
-    answer_text = llm_result["text"]
-
-    #returns complete llm metadata
-    metadata_text = llm_result["metadata"]
+    prompt = f"{system}\n\nCONTEXT:\n\n" + "\n\n---\n\n".join(context_pieces) + f"\n\nQUESTION:\n{question}"
+    return prompt, sources
 
-    # extract token counts using existing helper
-    token_counts = _extract_tokens_from_metadata(metadata_text)
 
+def _audit_record(question: str, answer_text: str, current_user, org_record: UUID, usage: LLMUsage, sources) -> AIAuditLogs:
     # Save an audit record for persistence
     # This is persisted to ai_audit_logs for analytics and investigation.
-    audit = AIAuditLogs(
-        prompt=body.question,
+    return AIAuditLogs(
+        prompt=question,
         response_text=answer_text,
         requester_email=current_user.email,
         requester_full_name=current_user.full_name,
-        organization_id=org_record,  # use the UUID result from the select
-        input_tokens=token_counts.get("input_tokens"),
-        output_tokens=token_counts.get("output_tokens"),
-        total_tokens=token_counts.get("total_tokens"),
-        model_name=token_counts.get("model_name"),
+        organization_id=org_record,  # resolved organization id
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        total_tokens=usage.total_tokens,
+        model_name=usage.model_name,
         # ensure JSONB-safe value (converts UUID/datetime -> strings) (THANKS CHATGPT)
         sources=jsonable_encoder(sources)
     )
 
-    session.add(audit)
+
+CACHE_HIT_USAGE = LLMUsage(input_tokens=0, output_tokens=0, total_tokens=0, model_name="answer_cache")
+
+
+@router.post("/ask")
+async def ask_route(body: AskRequest, 
+                    session: SessionDep, 
+                    current_user: UserDep):
+    org_record = await _resolve_organization(session, body, current_user)
+    org_id = str(org_record)  # Convert UUID to string for vector_search
+
+    query_embed = await _embed_question(body.question)
+    cache_version = await answer_cache_version(session, org_record)
+
+    # near-identical question already answered for this organization: no search, no tokens
+    cached = await lookup_cached_answer(session, org_record, query_embed)
+    if cached is not None:
+        await audit_sink.submit(_audit_record(body.question, cached.answer, current_user, org_record, CACHE_HIT_USAGE, cached.sources))
+        return {"answer": cached.answer, "cached": True}
+
+    vector_results = await vector_search(org_id=org_id, query=body.question, session=session, query_embed=query_embed)
+
+    if not vector_results:
+        return {"answer": NO_DOCUMENTS_ANSWER}
+
+    prompt, sources = _build_prompt(vector_results, body.question)
+
+    try:
+        llm_result = await llm_call(prompt, org_id=org_id)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="The model took too long to answer, please try again.")
+    # text to return to client
+    answer_text = llm_result.text
+
+    # persisted in the background by the audit sink (batched), not on this request
+    audit = _audit_record(body.question, answer_text, current_user, org_record, llm_result.usage, sources)
+    await audit_sink.submit(audit)
+    await store_answer(session, org_record, body.question, query_embed, answer_text, audit.sources, cache_version)
     await session.commit()
-    await session.refresh(audit)
 
     return {"answer": answer_text}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/ask/stream")
+async def ask_stream_route(body: AskRequest,
+                           session: SessionDep,
+                           current_user: UserDep):
+    """
+    Same as /chat/ask, but answers as Server-Sent Events while the model generates:
+    `token` events ({"text": ...}) followed by one `end` event ({"cached": bool}),
+    or an `error` event if generation fails midway.
+    """
+    org_record = await _resolve_organization(session, body, current_user)
+    org_id = str(org_record)
+
+    query_embed = await _embed_question(body.question)
+    cache_version = await answer_cache_version(session, org_record)
+
+    cached = await lookup_cached_answer(session, org_record, query_embed)
+    if cached is not None:
+        await audit_sink.submit(_audit_record(body.question, cached.answer, current_user, org_record, CACHE_HIT_USAGE, cached.sources))
+
+        async def cached_stream():
+            yield _sse("token", {"text": cached.answer})
+            yield _sse("end", {"cached": True})
+        return _event_stream_response(cached_stream())
+
+    vector_results = await vector_search(org_id=org_id, query=body.question, session=session, query_embed=query_embed)
+
+    if not vector_results:
+        async def empty_stream():
+            yield _sse("token", {"text": NO_DOCUMENTS_ANSWER})
+            yield _sse("end", {"cached": False})
+        return _event_stream_response(empty_stream())
+
+    prompt, sources = _build_prompt(vector_results, body.question)
+
+    async def answer_stream():
+        final = None
+        try:
+            async for event in llm_stream(prompt, org_id=org_id):
+                if event["type"] == "token":
+                    yield _sse("token", {"text": event["text"]})
+                else:
+                    final = event["result"]
+        except TimeoutError:
+            yield _sse("error", {"detail": "The model took too long to answer, please try again."})
+            return
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        audit = _audit_record(body.question, final.text, current_user, org_record, final.usage, sources)
+        await audit_sink.submit(audit)
+        # the request session may already be closed once streaming starts; use our own
+        async with async_session_maker() as cache_session:
+            await store_answer(cache_session, org_record, body.question, query_embed, final.text, audit.sources, cache_version)
+            await cache_session.commit()
+
+        yield _sse("end", {"cached": False})
+
+    return _event_stream_response(answer_stream())
+
+
+def _event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # no proxy buffering / caching, or tokens arrive in one lump at the end
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
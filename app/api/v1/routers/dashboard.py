@@ -3,6 +3,7 @@ from fastapi import Depends, APIRouter, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import select
 from app.models.user import UserCreate, UserResponse, User
+from app.models.organization import Organization
 from app.api.dependencies import SessionDep, UserDep, login_for_access_token
 from app.utils.jwt import Token
 from app.utils.hashing import pwd_context
@@ -52,11 +53,17 @@ async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()],db: S
 
 
 @router.get("/users/me/", response_model=UserResponse)
-async def user_info(current_user: UserDep):
+async def user_info(current_user: UserDep, session: SessionDep):
     org_name = None
-    if current_user.organization:
-        org_name = current_user.organization.organization_name
-    data = current_user.model_dump(exclude={"organization"})
-    return UserResponse(**data, organization=org_name)
+    if current_user.organization_id is not None:
+        org_name = await session.scalar(
+            select(Organization.organization_name).where(Organization.id == current_user.organization_id)
+        )
+    return UserResponse(
+        username=current_user.username,
+        email=current_user.email,
+        full_name=current_user.full_name,
+        organization=org_name,
+    )
 
 
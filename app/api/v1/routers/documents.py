@@ -1,12 +1,24 @@
+from collections import Counter
+from contextlib import ExitStack, nullcontext
 from datetime import datetime
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
+from functools import partial
+from pathlib import PurePosixPath
+from typing import List, Optional, Tuple
+from uuid import UUID
+import asyncio
+import zipfile
+from fastapi import APIRouter, File, Header, HTTPException, UploadFile, status
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlmodel import select
 
 from app.api.dependencies import SessionDep, UserDep
+from app.config import storage_settings, upload_settings
 from app.models.documents import Documents
-from app.utils.s3 import delete_file_from_s3, download_file_from_s3, file_exists_in_s3, upload_file_to_s3
-from app.services.embeddings import process_and_embed_single_document  # NEW
+from app.models.ingestion_jobs import IngestionJob, IngestionJobStatus
+from app.utils.storage import storage
+from app.services.ingestion_queue import enqueue_ingestion, enqueue_ingestion_many
+from app.services.ingestion_spool import remove_spool, spooled
+from app.services.answer_cache import invalidate_organization
 
 
 
@@ -20,7 +32,19 @@ ALLOWED_EXTENSIONS = {".pdf", ".txt"}
 def is_allowed_file(filename):
     return any(filename.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
 
-@router.post("/upload")
+def _zip_entry_problem(info: zipfile.ZipInfo, unpacked: int) -> Optional[str]:
+    """Why a zip entry is refused, None if it is within limits. `unpacked` = bytes accepted so far."""
+    # ZipExtFile never returns more than the declared file_size, so checking it is enough
+    mb = 1024 * 1024
+    if info.file_size > upload_settings.UPLOAD_ZIP_MAX_ENTRY_MB * mb:
+        return f"Larger than {upload_settings.UPLOAD_ZIP_MAX_ENTRY_MB} MB uncompressed."
+    if info.file_size > upload_settings.UPLOAD_ZIP_MAX_RATIO * max(info.compress_size, 1):
+        return f"Compression ratio above {upload_settings.UPLOAD_ZIP_MAX_RATIO}:1."
+    if unpacked + info.file_size > upload_settings.UPLOAD_ZIP_MAX_TOTAL_MB * mb:
+        return f"Archive exceeds {upload_settings.UPLOAD_ZIP_MAX_TOTAL_MB} MB uncompressed."
+    return None
+
+@router.post("/upload", status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(session: SessionDep,
                           current_user: UserDep,
                           file: UploadFile = File(...),
@@ -31,51 +55,205 @@ async def upload_document(session: SessionDep,
         raise HTTPException(status_code=400, detail="Only PDF and TXT files are allowed.")
     
     new_storage_key = f'{current_user.organization_id}_{file.filename}'
-    if file_exists_in_s3(new_storage_key) and not confirm:
+    exists = await storage.exists(new_storage_key)
+    if exists and not confirm:
         # Ask for confirmation
         raise HTTPException(
             status_code=409,
             detail=f'File already exists: {file.filename}. Send confirm=true to replace.'
         )
     
+    source_path = None
     try:
         """
-        If confirm to replace, to delete the existing row from db,
-        to not keep multiple duplicated rows with same storage_key but different id.
+        If confirm to replace, keep the existing row (and its chunks, still searchable)
+        and re-embed it; the ingestion job swaps in the new chunks atomically when done.
         """
-        if file_exists_in_s3(new_storage_key) and confirm:
+        document = None
+        if exists:
             old_doc_stmt = select(Documents).where(
                 Documents.organization_id == current_user.organization_id,
                 Documents.file_name == file.filename)
             old_doc_result = await session.execute(old_doc_stmt)
-            old_doc = old_doc_result.scalars().first()
-            if old_doc:
-                # Delete DB entry; S3 file will be overwritten below
-                await session.delete(old_doc)
-                await session.commit()
+            document = old_doc_result.scalars().first()
         
-        # Upload to AWS S3 (overwrites if exists)
-        upload_file_to_s3(file.file, new_storage_key)
-
-        # Persist new document row
-        new_document = Documents(
-            file_name=file.filename,
-            upload_by=current_user.username,
-            organization_id=current_user.organization_id,
-            uploaded_at=datetime.now(),
-            storage_key=new_storage_key
-        )
-        session.add(new_document)
+        # Upload to storage (overwrites if exists). PDFs are copied to the local ingestion
+        # spool on the way, so the ingestion job does not download them back
+        with spooled(file.file, file.filename) as (stream, source_path):
+            await storage.upload(stream, new_storage_key)
+
+        if document is not None:
+            document.upload_by = current_user.username
+            document.uploaded_at = datetime.now()
+        else:
+            # Persist new document row
+            document = Documents(
+                file_name=file.filename,
+                upload_by=current_user.username,
+                organization_id=current_user.organization_id,
+                uploaded_at=datetime.now(),
+                storage_key=new_storage_key
+            )
+        session.add(document)
+        # cached answers may quote the replaced document or miss the new one
+        await invalidate_organization(session, current_user.organization_id)
         await session.commit()
-        await session.refresh(new_document)
+        await session.refresh(document)
 
-        # Embed-on-upload: chunk + embed + store chunks (cascades on future delete)
-        await process_and_embed_single_document(session, new_document)
+        # Embed-on-upload runs in the background ingestion workers; poll the job for progress
+        job = await enqueue_ingestion(session, document, source_path=source_path)
 
-        return new_document
+        return {
+            "job_id": job.id,
+            "document_id": document.id,
+            "file_name": document.file_name,
+            "status": job.status,
+            "status_url": f"/documents/jobs/{job.id}",
+        }
     except Exception as e:
+        remove_spool(source_path)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/upload_batch", status_code=status.HTTP_202_ACCEPTED)
+async def upload_documents_batch(session: SessionDep,
+                                 current_user: UserDep,
+                                 files: List[UploadFile] = File(...),
+                                 confirm: bool = False):
+    """
+    Upload many PDF/TXT files, or .zip archives of them, in one request.
+
+    Existing files are found with one S3 listing of the organization's prefix, files are
+    transferred concurrently (multipart above S3_MULTIPART_THRESHOLD_MB) and every stored
+    file gets its own ingestion job. One file failing does not fail the batch: the response
+    is a manifest with a status per file (queued, exists, duplicate, rejected, failed).
+    """
+    if current_user.organization_id is None:
+        raise HTTPException(status_code=406, detail="Your don't have an organisation, create first")
+
+    prefix = f'{current_user.organization_id}_'
+    manifest = []
+    pending = []  # (manifest item, callable opening the file) to upload
+    seen = set()
+    with ExitStack() as archives:
+        existing_keys = await storage.list_keys(prefix)
+        for upload in files:
+            if upload.filename.lower().endswith(".zip"):
+                try:
+                    archive = archives.enter_context(zipfile.ZipFile(upload.file))
+                except zipfile.BadZipFile:
+                    manifest.append({"file_name": upload.filename, "status": "rejected", "detail": "Not a valid zip archive."})
+                    continue
+                members = [
+                    # folders inside the archive are flattened; documents are keyed by file name
+                    (PurePosixPath(info.filename).name, partial(archive.open, info), upload.filename, info)
+                    for info in archive.infolist()
+                    if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+                ]
+            else:
+                members = [(upload.filename, partial(nullcontext, upload.file), None, None)]
+
+            unpacked = 0  # uncompressed bytes accepted from this archive
+            for file_name, open_file, archive_name, info in members:
+                item = {"file_name": file_name, "status": "queued"}
+                if archive_name:
+                    item["archive"] = archive_name
+                manifest.append(item)
+                storage_key = f'{prefix}{file_name}'
+                if not is_allowed_file(file_name):
+                    item.update(status="rejected", detail="Only PDF and TXT files are allowed.")
+                elif info is not None and (problem := _zip_entry_problem(info, unpacked)):
+                    item.update(status="rejected", detail=problem)
+                elif file_name in seen:
+                    item.update(status="duplicate", detail="Same file name earlier in this batch.")
+                elif len(seen) >= upload_settings.UPLOAD_BATCH_MAX_FILES:
+                    item.update(status="rejected", detail=f"Batch limit of {upload_settings.UPLOAD_BATCH_MAX_FILES} files reached.")
+                elif storage_key in existing_keys and not confirm:
+                    item.update(status="exists", detail="File already exists. Send confirm=true to replace.")
+                else:
+                    seen.add(file_name)
+                    if info is not None:
+                        unpacked += info.file_size
+                    item["storage_key"] = storage_key
+                    pending.append((item, open_file))
+
+        limit = asyncio.Semaphore(upload_settings.UPLOAD_BATCH_CONCURRENCY)
+
+        async def store(item, open_file):
+            async with limit:
+                try:
+                    with open_file() as stream, spooled(stream, item["file_name"]) as (tee, source_path):
+                        await storage.upload(tee, item["storage_key"])
+                    item["source_path"] = source_path
+                except Exception as e:
+                    item.update(status="failed", detail=str(e))
+
+        await asyncio.gather(*(store(item, open_file) for item, open_file in pending))
+
+    stored = [item for item, _ in pending if item["status"] == "queued"]
+    if stored:
+        try:
+            # same replace semantics as /upload: existing rows are kept and re-embedded
+            old_docs_stmt = select(Documents).where(
+                Documents.organization_id == current_user.organization_id,
+                Documents.file_name.in_([item["file_name"] for item in stored]))
+            old_docs = {doc.file_name: doc for doc in (await session.execute(old_docs_stmt)).scalars()}
+            documents = []
+            for item in stored:
+                document = old_docs.get(item["file_name"])
+                if document is not None:
+                    document.upload_by = current_user.username
+                    document.uploaded_at = datetime.now()
+                    item["replaced"] = True
+                else:
+                    document = Documents(
+                        file_name=item["file_name"],
+                        upload_by=current_user.username,
+                        organization_id=current_user.organization_id,
+                        uploaded_at=datetime.now(),
+                        storage_key=item["storage_key"]
+                    )
+                    session.add(document)
+                documents.append(document)
+            await invalidate_organization(session, current_user.organization_id)
+            await session.flush()
+            # rows, cache invalidation and jobs are committed together
+            jobs = await enqueue_ingestion_many(session, documents, [item["source_path"] for item in stored])
+        except Exception as e:
+            for item in stored:
+                remove_spool(item["source_path"])
+            # objects without a document row would never be listed or deleted again; replaced
+            # files keep their (now rewritten) object, which their existing row still points to
+            orphans = [item["storage_key"] for item in stored if item["storage_key"] not in existing_keys]
+            await asyncio.gather(*(storage.delete(key) for key in orphans), return_exceptions=True)
+            raise HTTPException(status_code=500, detail=str(e))
+        for item, document, job in zip(stored, documents, jobs):
+            item.update(document_id=document.id, job_id=job.id, status_url=f"/documents/jobs/{job.id}")
+
+    for item in manifest:
+        item.pop("storage_key", None)
+        item.pop("source_path", None)
+    return {"summary": Counter(item["status"] for item in manifest), "files": manifest}
+
+@router.get("/jobs/{job_id}")
+async def ingestion_job_status(job_id: UUID, session: SessionDep, current_user: UserDep):
+    job = await session.get(IngestionJob, job_id)
+    if job is None or job.organization_id != current_user.organization_id:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found.")
+    return {
+        "job_id": job.id,
+        "document_id": job.document_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "chunks_embedded": job.chunks_embedded,
+        "chunks_total": job.chunks_total,
+        "last_error": job.last_error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "next_attempt_at": job.run_after.isoformat() if job.status == IngestionJobStatus.QUEUED and job.run_after else None,
+    }
+
 @router.get("/my_documents")
 async def show_documents(session: SessionDep, current_user: UserDep):
     # Return per-document freshness info using last_embedded_at vs uploaded_at
@@ -94,26 +272,87 @@ async def show_documents(session: SessionDep, current_user: UserDep):
         })
     return {"Documents": payload}
 
+def _parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive for a single "bytes=" range, None to send the whole file
+    (no header, several ranges, or an invalid range, which RFC 9110 says to ignore).
+    Raises 416 when the range starts at or beyond the end of the file.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    first, _, last = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            if last and int(last) < start:
+                # invalid range-spec (last-pos before first-pos)
+                return None
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail=f"Range not satisfiable for a file of {size} bytes.",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+@router.get("/download")
 @router.post("/download")
-async def download_document(session: SessionDep, curret_user: UserDep, filename: str):
+async def download_document(session: SessionDep,
+                            curret_user: UserDep,
+                            filename: str,
+                            redirect: Optional[bool] = None,
+                            range_header: Optional[str] = Header(default=None, alias="Range")):
+    """
+    Stream a document to the client in fixed-size pieces (single byte ranges are supported
+    for resumable / partial downloads). With redirect=true (or DOWNLOAD_PRESIGNED_REDIRECT)
+    the client is sent to a presigned S3 URL instead and the bytes never pass through the API.
+    """
+    doc_statement = select(Documents.storage_key).where(
+        Documents.organization_id == curret_user.organization_id,
+        Documents.file_name == filename)
+    doc_result = await session.execute(doc_statement)
+    download_doc = doc_result.scalars().first()
+
+    if not download_doc:
+        raise HTTPException(status_code=409, detail=f"File with name: {filename} not found, tip: check /documents/my_documents")
+
     try:
-        doc_statement = select(Documents.storage_key).where(
-            Documents.organization_id == curret_user.organization_id,
-            Documents.file_name == filename)
-        doc_result = await session.execute(doc_statement)
-        download_doc = doc_result.scalars().first()
-        
-        if not download_doc:
+        size = await storage.size(download_doc)
+        if size is None:
             raise HTTPException(status_code=409, detail=f"File with name: {filename} not found, tip: check /documents/my_documents")
-        
-        if not file_exists_in_s3(download_doc):
-            raise HTTPException(status_code=409, detail=f"File with name: {filename} not found, tip: check /documents/my_documents")
-        file_content = download_file_from_s3(download_doc)
+
+        if storage_settings.DOWNLOAD_PRESIGNED_REDIRECT if redirect is None else redirect:
+            url = await storage.presigned_url(download_doc, filename, storage_settings.DOWNLOAD_PRESIGNED_EXPIRES_SECONDS)
+            if url is not None:
+                # 303: the client follows with a GET, also when it called POST /download
+                return RedirectResponse(url, status_code=status.HTTP_303_SEE_OTHER)
+
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Accept-Ranges": "bytes",
+        }
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            start, length, status_code = 0, size, status.HTTP_200_OK
+        else:
+            start, end = byte_range
+            length, status_code = end - start + 1, status.HTTP_206_PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(length)
         return StreamingResponse(
-            iter([file_content]),
+            storage.stream(download_doc, start, length),
+            status_code=status_code,
             media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers=headers,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -134,9 +373,10 @@ async def delete_document(filename: str,
     if not doc:
         raise HTTPException(status_code=409, detail=f"Failed: Document with {filename} not found.")
     
-    # Delete from S3 first (best effort)
-    delete_file_from_s3(doc.storage_key)
+    # Delete from storage first (best effort)
+    await storage.delete(doc.storage_key)
     # Delete DB row; chunks are removed via ON DELETE CASCADE
     await session.delete(doc)
+    await invalidate_organization(session, doc.organization_id)
     await session.commit()
     return {"detail": f"Success: Document {filename} deleted (including all chunks/embeddings)."}
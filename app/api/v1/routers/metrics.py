@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException
+
+from app.api.dependencies import UserDep
+from app.services.embedder import embedding_store, query_embedding_cache
+from app.services.audit_sink import audit_sink
+from app.database.session import pool_stats
+from app.services.user_cache import user_cache
+from app.services.organization_cache import organization_cache
+
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+@router.get("/")
+async def get_metrics(current_user: UserDep):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can view metrics.")
+    return {
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "embedding_store": None if embedding_store is None else embedding_store.stats(),
+        "audit_sink": audit_sink.stats(),
+        "db_pool": pool_stats(),
+        "user_cache": user_cache.stats(),
+        "organization_cache": organization_cache.stats(),
+    }
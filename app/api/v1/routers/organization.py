@@ -4,10 +4,13 @@ from fastapi import Depends, HTTPException
 from sqlmodel import select
 from app.models.documents import Documents
 from app.models.organization import OrganizationCreate, Organization, OrganizationDelete
+from app.models.user import User
 from app.api.dependencies import SessionDep, UserDep
 from datetime import datetime
 
-from app.utils.s3 import delete_file_from_s3
+from app.utils.storage import storage
+from app.services.user_cache import user_cache
+from app.services.organization_cache import organization_cache
 
 router = APIRouter(
     prefix="/organization",
@@ -35,34 +38,38 @@ async def create_organization(new_organization: OrganizationCreate, current_user
     await session.refresh(new_organization)
 
     # Update user's organization_id
-    current_user.organization_id = new_organization.id
+    user = await session.get(User, current_user.id)
+    user.organization_id = new_organization.id
     await session.commit()
-    await session.refresh(current_user)
+    user_cache.invalidate_user(current_user.id)
+    organization_cache.invalidate(name=new_organization.organization_name)
 
     return {"message": "Organization created successfully!", "organization_name": new_organization.organization_name}
 
 
 @router.delete("/delete/")
 async def delete_organization(delete_organization: OrganizationDelete, current_user: UserDep, session: SessionDep):
-    if not current_user.organization:
+    organization = None
+    if current_user.organization_id is not None:
+        organization = await session.get(Organization, current_user.organization_id)
+    if not organization:
         raise HTTPException(status_code=400, detail="You don't have organization")
     
-    if not delete_organization.organization_name == current_user.organization.organization_name:
+    if not delete_organization.organization_name == organization.organization_name:
         raise HTTPException(status_code=400, detail="Please type your organization name, in case if you forget check dashboard / User Info")
     
-    docs_stmt = select(Documents).where(Documents.organization_id == current_user.organization.id)
+    docs_stmt = select(Documents).where(Documents.organization_id == organization.id)
     docs_result = await session.execute(docs_stmt)
     docs = docs_result.scalars().all()
     for doc in docs:
-        delete_file_from_s3(doc.storage_key)  # Delete file from S3
+        await storage.delete(doc.storage_key)  # Delete file from storage
         await session.delete(doc)             # Delete document from DB
     await session.commit()
     
-    statement = select(Organization).where(Organization.organization_name == delete_organization.organization_name)
-    result = await session.execute(statement)
-    organization_result = result.scalars().first()
-    
-    await session.delete(organization_result)
+    await session.delete(organization)
     await session.commit()
+    # the flush cleared organization_id on the user row
+    user_cache.invalidate_user(current_user.id)
+    organization_cache.invalidate(name=organization.organization_name, org_id=organization.id)
     
     return {"message": "Successfully organization deleted.", "organization_name": delete_organization.organization_name}
\ No newline at end of file
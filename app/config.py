@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -14,6 +16,17 @@ class DatabaseSettings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
 
+    # Connection pool (per process)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    # Recycle connections older than this (seconds); -1 disables
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # asyncpg prepared statement cache per connection; set 0 behind pgbouncer transaction pooling
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_ECHO: bool = False
+
     model_config = _base_config
 
     @property
@@ -31,15 +44,64 @@ class SecuritySettings(BaseSettings):
     JWT_SECRET: str
     JWT_ALGORITHM: str
     JWT_TOKEN_EXPIRE_MINUTES: int
+    # Authenticated-user snapshots kept per process (0 disables); bounds how long a change
+    # made through another API process can go unnoticed
+    AUTH_USER_CACHE_TTL_SECONDS: int = 30
+    AUTH_USER_CACHE_SIZE: int = 10000
 
     model_config = _base_config
 
 
 class AWSSettings(BaseSettings):
-    AWS_ACCESS_KEY_ID: str
-    AWS_SECRET_ACCESS_KEY: str
-    AWS_REGION: str
-    AWS_S3_BUCKET: str
+    # Optional so STORAGE_BACKEND=local runs without AWS; unset keys fall back to the
+    # default boto3 credential chain (instance profile, ~/.aws, ...)
+    AWS_ACCESS_KEY_ID: Optional[str] = None
+    AWS_SECRET_ACCESS_KEY: Optional[str] = None
+    AWS_REGION: Optional[str] = None
+    AWS_S3_BUCKET: str = ""
+    # Objects larger than the threshold are uploaded as multipart, parts of PART_SIZE, with
+    # up to MAX_CONCURRENCY parts of one object in flight
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+    S3_MULTIPART_PART_SIZE_MB: int = 8
+    S3_MAX_CONCURRENCY: int = 8
+    # HTTP connections kept by the shared S3 client (botocore default is 10)
+    S3_MAX_POOL_CONNECTIONS: int = 64
+    # botocore retries (throttling, 5xx, connection errors): attempts include the first
+    # call; "adaptive" also rate-limits the client when S3 throttles
+    S3_MAX_ATTEMPTS: int = 5
+    S3_RETRY_MODE: str = "standard"
+    S3_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    S3_READ_TIMEOUT_SECONDS: float = 60.0
+
+    model_config = _base_config
+
+
+class StorageSettings(BaseSettings):
+    # Where documents live: "s3" or "local" (files under STORAGE_LOCAL_ROOT, no AWS needed)
+    STORAGE_BACKEND: str = "s3"
+    STORAGE_LOCAL_ROOT: str = "storage"
+    # Threads running blocking storage calls; bounds transfers in flight per process
+    STORAGE_THREAD_POOL_SIZE: int = 32
+    # Bytes read from storage per piece of a streamed download (memory per download)
+    STORAGE_STREAM_CHUNK_SIZE_KB: int = 256
+    # /documents/download answers with a redirect to a presigned S3 URL instead of
+    # streaming through the API (per request: ?redirect=true/false)
+    DOWNLOAD_PRESIGNED_REDIRECT: bool = False
+    DOWNLOAD_PRESIGNED_EXPIRES_SECONDS: int = 300
+
+    model_config = _base_config
+
+
+class UploadSettings(BaseSettings):
+    # Files (zip entries included) accepted by one /documents/upload_batch request
+    UPLOAD_BATCH_MAX_FILES: int = 500
+    # Files of one batch transferred to storage at once
+    UPLOAD_BATCH_CONCURRENCY: int = 8
+    # Zip archives: limits on the uncompressed size of one entry and of all accepted entries
+    # of an archive, and on an entry's compression ratio (zip bombs)
+    UPLOAD_ZIP_MAX_ENTRY_MB: int = 200
+    UPLOAD_ZIP_MAX_TOTAL_MB: int = 2048
+    UPLOAD_ZIP_MAX_RATIO: int = 100
 
     model_config = _base_config
 
@@ -50,9 +112,138 @@ class llmSettings(BaseSettings):
     LANGSMITH_PROJECT: str
     LANGSMITH_TRACING: str
 
+    LLM_MODEL: str = "gemini-2.5-flash"
+    LLM_MAX_RETRIES: int = 2
+    # Per HTTP request to Gemini, and for a whole llm_call (retries included) or llm_stream
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 60.0
+    LLM_TOTAL_TIMEOUT_SECONDS: float = 150.0
+    # Generations in flight for the whole process, and for any single organization
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_MAX_CONCURRENCY_PER_ORG: int = 4
+
+    model_config = _base_config
+
+
+class EmbeddingSettings(BaseSettings):
+    # "gemini" for the real model, "fake" for deterministic offline vectors (no API calls)
+    EMBEDDING_PROVIDER: str = "gemini"
+    # Texts sent per embed_documents call (Gemini caps a batch at 100)
+    EMBED_BATCH_SIZE: int = 100
+    # Max batches in flight at once per ingested document
+    EMBED_MAX_CONCURRENCY: int = 4
+    # Threads running the (sync) embedding client, shared by queries and ingestion
+    EMBED_THREAD_POOL_SIZE: int = 8
+    # Embedding calls in flight across the whole process; extra callers wait their turn
+    EMBED_MAX_IN_FLIGHT: int = 16
+    # Per-call timeout in seconds (query or batch)
+    EMBED_TIMEOUT_SECONDS: float = 30.0
+    # Query embedding cache: in-process LRU entries and their lifetime
+    EMBED_CACHE_SIZE: int = 10000
+    EMBED_CACHE_TTL_SECONDS: float = 3600.0
+    # Shared tier behind the in-process cache: "" (off) or "postgres". The postgres store is
+    # also the global dedup store ingestion consults before embedding chunk text
+    EMBED_CACHE_SHARED_BACKEND: str = "postgres"
+    # Rows kept in the shared store (least recently used evicted first); 0 = unbounded
+    EMBED_STORE_MAX_ROWS: int = 1000000
+    # Store hits are counted in memory and written (last_used_at, hit_count) in one batch
+    # per flush interval; eviction beyond MAX_ROWS runs every evict interval
+    EMBED_STORE_FLUSH_INTERVAL_SECONDS: float = 30.0
+    EMBED_STORE_EVICT_INTERVAL_SECONDS: float = 600.0
+
+    model_config = _base_config
+
+
+class IngestionSettings(BaseSettings):
+    # Background workers started inside the API process (0 = run them elsewhere)
+    INGESTION_WORKERS: int = 2
+    # Seconds an idle worker waits before polling the queue again
+    INGESTION_POLL_INTERVAL: float = 2.0
+    INGESTION_MAX_ATTEMPTS: int = 5
+    # Retry backoff: base * 2^(attempt-1), capped at max
+    INGESTION_RETRY_BASE_SECONDS: float = 10.0
+    INGESTION_RETRY_MAX_SECONDS: float = 600.0
+    # A running job without a heartbeat for this long is treated as abandoned and reclaimed
+    INGESTION_STALE_AFTER_SECONDS: float = 900.0
+    # Re-embedding reuses the embeddings of unchanged chunks (same content hash); turn off
+    # to re-embed everything, e.g. after changing the embedding model
+    INGESTION_INCREMENTAL: bool = True
+    # Worker processes parsing + splitting PDFs off the event loop (0 = a thread in-process)
+    INGESTION_PARSE_PROCESSES: int = 2
+    # Pages per parse task sent to a worker process
+    INGESTION_PARSE_PAGES_PER_TASK: int = 16
+    # Parse tasks read their page ranges from storage (ranged reads). With this on, a job
+    # without an upload spool file first downloads the whole object to the spool dir and the
+    # tasks read that copy: fewer storage requests, at the cost of a full-size temp file
+    INGESTION_PARSE_LOCAL_COPY: bool = False
+    # Uploads keep a local copy of each PDF for the ingestion job, so workers on the same
+    # host parse it instead of downloading it back from storage (only in processes running
+    # INGESTION_WORKERS). "" = <tmp>/ingestion-spool; copies are removed when the job
+    # finishes, leftovers older than MAX_AGE by a sweep every SWEEP_INTERVAL
+    INGESTION_SPOOL_ENABLED: bool = True
+    INGESTION_SPOOL_DIR: str = ""
+    INGESTION_SPOOL_MAX_AGE_SECONDS: float = 86400.0
+    INGESTION_SPOOL_SWEEP_INTERVAL_SECONDS: float = 600.0
+    # Batches waiting between ingestion pipeline stages (split -> embed -> write); bounds memory
+    INGESTION_PIPELINE_QUEUE_SIZE: int = 4
+    # How chunk rows are written: "copy" (binary COPY) or "insert" (executemany batches)
+    CHUNK_WRITER: str = "copy"
+    # Rows per COPY buffer / INSERT batch
+    CHUNK_WRITE_BATCH_SIZE: int = 1000
+
+    model_config = _base_config
+
+
+class VectorSearchSettings(BaseSettings):
+    # HNSW candidate list size per query: higher = better recall, slower
+    HNSW_EF_SEARCH: int = 40
+    # IVFFlat lists probed per query (only used if an ivfflat index exists)
+    IVFFLAT_PROBES: int = 10
+    # pgvector >= 0.8: keep scanning the index until enough rows pass the organization
+    # filter ("strict_order" / "relaxed_order"); empty string disables it for older pgvector
+    HNSW_ITERATIVE_SCAN: str = "strict_order"
+
+    model_config = _base_config
+
+
+class AnswerCacheSettings(BaseSettings):
+    ANSWER_CACHE_ENABLED: bool = True
+    # Cosine similarity a new question needs with a cached one to reuse its answer
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL_SECONDS: float = 86400.0
+    # Oldest entries beyond this are dropped per organization
+    ANSWER_CACHE_MAX_PER_ORG: int = 1000
+
+    model_config = _base_config
+
+
+class OrganizationCacheSettings(BaseSettings):
+    # organization name -> id lookups kept per process for /chat/ask
+    ORG_CACHE_SIZE: int = 10000
+    ORG_CACHE_TTL_SECONDS: float = 300.0
+
+    model_config = _base_config
+
+
+class AuditSettings(BaseSettings):
+    # Records waiting in memory before submit() starts to push back
+    AUDIT_QUEUE_MAX: int = 10000
+    # Write when this many records are waiting, or after the interval, whichever is first
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # How long a request waits for room in a full queue before the record is dropped
+    AUDIT_ENQUEUE_TIMEOUT_SECONDS: float = 0.05
+
     model_config = _base_config
 
 db_settings = DatabaseSettings()
 security_settings = SecuritySettings()
 aws_settings = AWSSettings()
-llm_settings = llmSettings()
\ No newline at end of file
+storage_settings = StorageSettings()
+upload_settings = UploadSettings()
+llm_settings = llmSettings()
+embedding_settings = EmbeddingSettings()
+ingestion_settings = IngestionSettings()
+vector_search_settings = VectorSearchSettings()
+answer_cache_settings = AnswerCacheSettings()
+audit_settings = AuditSettings()
+organization_cache_settings = OrganizationCacheSettings()
@@ -1,17 +1,84 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel
 
 from app.config import db_settings
 
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            checkouts = self.checkouts
+            wait_total = self.wait_seconds_total
+            wait_max = self.wait_seconds_max
+            timeouts = self.timeouts
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            # negative until the pool has opened pool_size connections
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_ms_avg": round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            "wait_ms_max": round(wait_max * 1000, 3),
+        }
+
+
 # Create a database engine to connect with database
 # ensure db_settings.POSTGRES_URL is postgresql+asyncpg://... or plain but we'll force ssl here
 engine = create_async_engine(
     url=db_settings.POSTGRES_URL,
-    echo=True,
-    #connect_args={"ssl": True},  # force TLS for asyncpg
+    echo=db_settings.DB_ECHO,
+    poolclass=InstrumentedQueuePool,
+    pool_size=db_settings.DB_POOL_SIZE,
+    max_overflow=db_settings.DB_MAX_OVERFLOW,
+    pool_timeout=db_settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_pre_ping=db_settings.DB_POOL_PRE_PING,
+    pool_recycle=db_settings.DB_POOL_RECYCLE_SECONDS,
+    connect_args={
+        "statement_cache_size": db_settings.DB_STATEMENT_CACHE_SIZE,
+        #"ssl": True,  # force TLS for asyncpg
+    },
 )
 
+# One session factory for the whole process (request sessions and background work)
+async_session_maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def pool_stats() -> dict:
+    return engine.pool.stats()
+
 
 async def create_db_tables():
     async with engine.begin() as connection:
@@ -19,6 +86,9 @@ async def create_db_tables():
         from app.models.user import User 
         from app.models.organization import Organization  
         from app.models.documents import Documents, DocumentChunk
+        from app.models.ingestion_jobs import IngestionJob
+        from app.models.embedding_cache import EmbeddingCacheEntry
+        from app.models.answer_cache import AnswerCacheEntry
 
         # Ensure pgvector extension exists BEFORE creating tables using vector type
         await connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS vector")
@@ -28,11 +98,7 @@ async def create_db_tables():
 
 
 async def get_session():
-    async_session = sessionmaker(
-        bind=engine, class_=AsyncSession, expire_on_commit=False,
-    )
-
-    async with async_session() as session:
+    async with async_session_maker() as session:
         yield session
 
 
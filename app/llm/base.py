@@ -8,31 +8,96 @@ os.environ["LANGSMITH_PROJECT"] = llm_settings.LANGSMITH_PROJECT
 
 
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 import asyncio
-from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional, List, Dict, Any
 
+# One client for the process: its HTTP connections are reused across calls
 llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
+    model=llm_settings.LLM_MODEL,
     temperature=0,
     max_tokens=None,
-    timeout=None,
-    max_retries=2,
+    timeout=llm_settings.LLM_REQUEST_TIMEOUT_SECONDS,
+    max_retries=llm_settings.LLM_MAX_RETRIES,
     api_key=llm_settings.GEMINI_API_KEY
 )
 
 
-async def llm_call(prompt: Optional[str] = None, *, system: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, **kwargs: Any) -> str:
+class ConcurrencyLimiter:
+    """
+    Caps generations in flight globally and per organization, so one busy tenant
+    cannot take every slot. Callers without an organization only use the global cap.
+    An organization's semaphore only exists while it has calls running or waiting.
     """
-    Async wrapper for the sync langchain ChatGoogleGenerativeAI instance.
 
-    - Provide either `prompt` (string) or `messages` (list of dicts like {"role":"system"/"user", "content": "..."}).
-    - `system` is a shortcut to add a system message before the user prompt.
-    - Runs the sync LLM call in a thread to avoid blocking the event loop.
-    - Returns plain text extracted from the model result.
+    def __init__(self, global_limit: int, per_key_limit: int):
+        self.per_key_limit = per_key_limit
+        self._global = asyncio.Semaphore(global_limit)
+        # key -> [semaphore, callers holding or waiting for it]
+        self._per_key: Dict[str, list] = {}
 
-    Adapt extraction logic below if your llm returns a different structure.
-    """
+    @asynccontextmanager
+    async def slot(self, key: Optional[str] = None):
+        if key is None:
+            async with self._global:
+                yield
+            return
+        entry = self._per_key.get(key)
+        if entry is None:
+            entry = self._per_key[key] = [asyncio.Semaphore(self.per_key_limit), 0]
+        entry[1] += 1
+        try:
+            # take the organization slot first so a saturated tenant waits without holding a global slot
+            async with entry[0]:
+                async with self._global:
+                    yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                # idle: forget it, or the dict grows with every organization ever seen
+                del self._per_key[key]
+
+
+llm_limiter = ConcurrencyLimiter(llm_settings.LLM_MAX_CONCURRENCY, llm_settings.LLM_MAX_CONCURRENCY_PER_ORG)
+
+
+def _message_text(content: Any) -> str:
+    """Chat model content is a string or a list of parts ({"type": "text", "text": ...})."""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content or [])
+
+
+@dataclass(frozen=True, slots=True)
+class LLMUsage:
+    """Token usage of one generation, as stored in ai_audit_logs."""
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    model_name: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class LLMResult:
+    text: str
+    usage: LLMUsage = field(default_factory=LLMUsage)
+
+
+def _usage_from_message(message: Any) -> LLMUsage:
+    """Token usage straight from the AIMessage fields (no parsing of the stringified result)."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    response_metadata = getattr(message, "response_metadata", None) or {}
+    return LLMUsage(
+        input_tokens=usage.get("input_tokens"),
+        output_tokens=usage.get("output_tokens"),
+        total_tokens=usage.get("total_tokens"),
+        model_name=response_metadata.get("model_name") or llm_settings.LLM_MODEL,
+    )
+
+
+def _build_messages(prompt: Optional[str], system: Optional[str], messages: Optional[List[Dict[str, str]]]) -> list:
     if messages is None:
         if prompt is None:
             raise ValueError("either prompt or messages is required")
@@ -51,41 +116,63 @@ async def llm_call(prompt: Optional[str] = None, *, system: Optional[str] = None
                 msg_objs.append(SystemMessage(content=content))
             else:
                 msg_objs.append(HumanMessage(content=content))
+    return msg_objs
 
-    def sync_call():
-        # try calling the llm directly (LangChain chat models usually accept message objects)
+
+async def llm_call(prompt: Optional[str] = None, *, system: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, org_id: Optional[str] = None, **kwargs: Any) -> LLMResult:
+    """
+    Async call to the chat model (native ainvoke, no worker thread).
+
+    - Provide either `prompt` (string) or `messages` (list of dicts like {"role":"system"/"user", "content": "..."}).
+    - `system` is a shortcut to add a system message before the user prompt.
+    - `org_id` puts the call under that organization's concurrency cap (plus the global one).
+    - Raises TimeoutError after LLM_TOTAL_TIMEOUT_SECONDS (retries included).
+    - Returns the answer text and its typed token usage.
+    """
+    msg_objs = _build_messages(prompt, system, messages)
+
+    async with llm_limiter.slot(org_id):
+        result = await asyncio.wait_for(
+            llm.ainvoke(msg_objs, **kwargs),
+            timeout=llm_settings.LLM_TOTAL_TIMEOUT_SECONDS,
+        )
+
+    return LLMResult(text=_message_text(result.content), usage=_usage_from_message(result))
+
+
+async def llm_stream(prompt: Optional[str] = None, *, system: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, org_id: Optional[str] = None, **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the answer while the model generates it. Same inputs as llm_call.
+
+    Yields {"type": "token", "text": "..."} for every non-empty chunk, then exactly one
+    {"type": "end", "result": LLMResult} with the full answer and the token usage summed
+    over the stream.
+
+    Raises TimeoutError when the whole stream takes longer than LLM_TOTAL_TIMEOUT_SECONDS,
+    so a stalled upstream cannot hold its concurrency slots (and the client) forever.
+    """
+    msg_objs = _build_messages(prompt, system, messages)
+
+    aggregate = None
+    parts: List[str] = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + llm_settings.LLM_TOTAL_TIMEOUT_SECONDS
+    async with llm_limiter.slot(org_id):
+        chunks = llm.astream(msg_objs, **kwargs)
         try:
-            return llm(msg_objs, **kwargs)
-        except TypeError:
-            # fallback to generate if direct call signature differs
-            try:
-                return llm.generate([msg_objs], **kwargs)
-            except Exception as e:
-                raise
-
-    result = await asyncio.to_thread(sync_call)
-
-    # Simple, robust extraction
-    text = None
-    try:
-        if hasattr(result, "generations"):
-            gen = result.generations[0][0]
-            text = getattr(gen, "text", None) or getattr(gen, "content", None) or str(gen)
-        elif isinstance(result, str):
-            text = result
-        elif isinstance(result, dict):
-            text = result.get("text") or result.get("content") or str(result)
-        elif hasattr(result, "content"):
-            text = str(getattr(result, "content"))
-        else:
-            text = str(result)
-    except Exception:
-        text = str(result)
-
-    # Keep metadata minimal and safe to store: include llm_output if available and raw stringified result
-    metadata: Dict[str, Any] = {
-        "raw": str(result),
-        "llm_output": getattr(result, "llm_output", None)
-    }
-
-    return {"text": text, "metadata": metadata}
\ No newline at end of file
+            while True:
+                # each wait gets what is left of the deadline (not a timeout per chunk)
+                try:
+                    chunk = await asyncio.wait_for(anext(chunks), timeout=max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+                # AIMessageChunk supports "+": usage_metadata is summed across chunks
+                aggregate = chunk if aggregate is None else aggregate + chunk
+                text = _message_text(chunk.content)
+                if text:
+                    parts.append(text)
+                    yield {"type": "token", "text": text}
+        finally:
+            await chunks.aclose()
+
+    yield {"type": "end", "result": LLMResult(text="".join(parts), usage=_usage_from_message(aggregate))}
@@ -12,13 +12,34 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.v1.router import master_router
 from app.database.session import create_db_tables
+from app.services.ingestion_queue import IngestionWorkerPool
+from app.services.embedder import embedding_store, shutdown_async_embedder
+from app.services.pdf_pages import shutdown_parse_executor
+from app.services.audit_sink import audit_sink
+from app.utils.storage import storage
 from scalar_fastapi import get_scalar_api_reference
 
 
 @asynccontextmanager
 async def lifespan_handler(app: FastAPI):
     await create_db_tables()
+    # Batched background writer for ai_audit_logs
+    audit_sink.start()
+    # Batched recency writes + periodic eviction for the shared embedding store
+    if embedding_store is not None:
+        embedding_store.start()
+    # Background embed-on-upload workers (ingestion_jobs queue)
+    ingestion_workers = IngestionWorkerPool()
+    ingestion_workers.start()
     yield
+    await ingestion_workers.stop()
+    shutdown_async_embedder()
+    shutdown_parse_executor()
+    storage.shutdown()
+    # flush audit records still in memory before the process exits
+    await audit_sink.stop()
+    if embedding_store is not None:
+        await embedding_store.stop()
 
 app = FastAPI(
     title="AI-Powered FAQ Bot API",
@@ -22,7 +22,7 @@ class AIAuditLogs(SQLModel, table=True):
     # organization required: every audit row must belong to an organization
     organization_id: UUID | None = Field(default=None, foreign_key="organizations.id", index=True)
     #Relationship organization - logs
-    organization: "Organization" = Relationship(back_populates="logs", sa_relationship_kwargs={"lazy": "selectin"})
+    organization: "Organization" = Relationship(back_populates="logs", sa_relationship_kwargs={"lazy": "raise"})
     
     requester_email: Optional[str] = Field(default=None)
     requester_full_name: Optional[str] = Field(default=None)
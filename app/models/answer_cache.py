@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import uuid4, UUID
+from sqlmodel import Column, Field, SQLModel
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+
+class AnswerCacheEntry(SQLModel, table=True):
+    """A previously generated /chat/ask answer, reusable for near-identical questions in the same organization."""
+    __tablename__ = "answer_cache"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    # entries are wiped per organization whenever its documents change
+    organization_id: UUID = Field(foreign_key="organizations.id", ondelete="CASCADE", nullable=False, index=True)
+    question: str = Field(sa_column=Column(postgresql.TEXT, nullable=False))
+    # normalized embedding of the question; matched with <#> like document_chunks
+    question_embedding: List[float] = Field(sa_column=Column(Vector(768), nullable=False))
+    answer: str = Field(sa_column=Column(postgresql.TEXT, nullable=False))
+    sources: Optional[list] = Field(default=None, sa_column=Column(postgresql.JSONB, nullable=True))
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column=Column(postgresql.TIMESTAMP, nullable=False))
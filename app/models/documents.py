@@ -1,5 +1,6 @@
 from datetime import datetime
 from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlalchemy import BigInteger, Index, Sequence
 from sqlalchemy.dialects import postgresql
 from uuid import uuid4, UUID
 from typing import TYPE_CHECKING, List, Optional
@@ -32,7 +33,14 @@ class Documents(DocumentsBase, table=True):
         )
     )
     organization_id: UUID | None = Field(default=None, foreign_key="organizations.id")
-    organization: "Organization" = Relationship(back_populates="documents", sa_relationship_kwargs={"lazy": "selectin"})
+    organization: "Organization" = Relationship(back_populates="documents", sa_relationship_kwargs={"lazy": "raise"})
+
+    # Generation of document_chunks that searches read; re-embedding writes a new generation
+    # and switches this in one transaction, then deletes the older ones
+    active_generation: int = Field(
+        default=0,
+        sa_column=Column(BigInteger, nullable=False, server_default="0"),
+    )
 
     # Track if embeddings are up to date vs upload time
     last_embedded_at: Optional[datetime] = Field(
@@ -43,19 +51,42 @@ class Documents(DocumentsBase, table=True):
     # Relationship to chunks
     chunks: List["DocumentChunk"] = Relationship(
         back_populates="document",
-        sa_relationship_kwargs={"lazy": "selectin", "cascade": "all, delete-orphan", "passive_deletes": True},
+        sa_relationship_kwargs={"lazy": "raise", "cascade": "all, delete-orphan", "passive_deletes": True},
     )
 
 
+# Source of chunk generations: unique across concurrent ingestion jobs for the same document
+chunk_generation_seq = Sequence("document_chunk_generation_seq", metadata=SQLModel.metadata)
+
+
 class DocumentChunk(SQLModel, table=True):
     __tablename__ = "document_chunks"
+    # ANN index for vector_search; opclass must match the distance operator used there (<#> = inner product)
+    __table_args__ = (
+        Index(
+            "ix_document_chunks_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_ip_ops"},
+        ),
+        Index("ix_document_chunks_document_id_generation", "document_id", "generation"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     document_id: UUID = Field(foreign_key="documents.id", ondelete="CASCADE", nullable=False, index=True)
+    # chunks are visible only while this equals documents.active_generation
+    generation: int = Field(
+        default=0,
+        sa_column=Column(BigInteger, nullable=False, server_default="0"),
+    )
     # store chunk text as Postgres TEXT 
     content: str = Field(
         sa_column=Column(postgresql.TEXT, nullable=False)
     )
 
+    # sha256 of content; re-embedding reuses the embedding of chunks whose hash is unchanged
+    content_hash: Optional[str] = Field(default=None, sa_column=Column(postgresql.VARCHAR(64), nullable=True))
+
     # Embedding uses pgvector
     embedding: List[float] = Field(sa_column=Column(Vector(768), nullable=False))
 
@@ -73,11 +104,11 @@ class DocumentChunk(SQLModel, table=True):
     # Relationship back to parent document
     document: "Documents" = Relationship(
         back_populates="chunks",
-        sa_relationship_kwargs={"lazy": "selectin", "passive_deletes": True},
+        sa_relationship_kwargs={"lazy": "raise", "passive_deletes": True},
     )
     organization_id: UUID | None = Field(default=None, foreign_key="organizations.id", index=True)
     # back_populates should match Organization.chunks
-    organization: "Organization" = Relationship(back_populates="chunks", sa_relationship_kwargs={"lazy": "selectin"})
+    organization: "Organization" = Relationship(back_populates="chunks", sa_relationship_kwargs={"lazy": "raise"})
  
 
 from app.models.organization import Organization #fix mapper
\ No newline at end of file
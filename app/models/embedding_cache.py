@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import List
+from sqlmodel import Column, Field, SQLModel
+from sqlalchemy import BigInteger, func
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+
+class EmbeddingCacheEntry(SQLModel, table=True):
+    """Shared (cross-worker) tier of the query embedding cache and global embedding dedup store."""
+    __tablename__ = "embedding_cache"
+
+    # key: which model/dimension produced the vector + sha256 of the normalized text
+    model: str = Field(primary_key=True)
+    dimension: int = Field(primary_key=True)
+    text_hash: str = Field(primary_key=True)
+
+    embedding: List[float] = Field(sa_column=Column(Vector(768), nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column=Column(postgresql.TIMESTAMP, nullable=False))
+    # least recently used rows are evicted first once the store is over its size bound
+    last_used_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(postgresql.TIMESTAMP, nullable=False, server_default=func.now(), index=True),
+    )
+    hit_count: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
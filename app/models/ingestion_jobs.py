@@ -0,0 +1,55 @@
+from typing import Optional
+from datetime import datetime
+from uuid import uuid4, UUID
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Index
+from sqlalchemy.dialects import postgresql
+
+
+class IngestionJobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    # no further attempts will be made
+    FINISHED = (SUCCEEDED, FAILED)
+
+
+class IngestionJob(SQLModel, table=True):
+    __tablename__ = "ingestion_jobs"
+    # workers poll on (status, run_after)
+    __table_args__ = (Index("ix_ingestion_jobs_status_run_after", "status", "run_after"),)
+
+    id: UUID = Field(
+        sa_column=Column(
+            postgresql.UUID,
+            default=uuid4,
+            primary_key=True,
+        )
+    )
+    # job goes away together with its document (ON DELETE CASCADE)
+    document_id: UUID = Field(foreign_key="documents.id", ondelete="CASCADE", nullable=False, index=True)
+    organization_id: UUID | None = Field(default=None, foreign_key="organizations.id", index=True)
+
+    # queued -> running -> succeeded | failed (queued again between retries)
+    status: str = Field(default=IngestionJobStatus.QUEUED)
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    last_error: Optional[str] = Field(default=None, sa_column=Column(postgresql.TEXT, nullable=True))
+    # local copy of the uploaded file on the uploading host (ingestion_spool); parsed
+    # instead of the stored object when the worker can see it
+    source_path: Optional[str] = Field(default=None, sa_column=Column(postgresql.TEXT, nullable=True))
+
+    # progress reported by the worker while embedding
+    chunks_total: Optional[int] = Field(default=None)
+    chunks_embedded: int = Field(default=0)
+
+    # earliest time a worker may claim the job (pushed forward on retry backoff)
+    run_after: datetime = Field(default_factory=datetime.utcnow, sa_column=Column(postgresql.TIMESTAMP, nullable=False))
+    # worker that holds the job and its last sign of life; stale heartbeats get reclaimed
+    locked_by: Optional[str] = Field(default=None)
+    heartbeat_at: Optional[datetime] = Field(default=None, sa_column=Column(postgresql.TIMESTAMP, nullable=True))
+
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column=Column(postgresql.TIMESTAMP, nullable=False))
+    started_at: Optional[datetime] = Field(default=None, sa_column=Column(postgresql.TIMESTAMP, nullable=True))
+    finished_at: Optional[datetime] = Field(default=None, sa_column=Column(postgresql.TIMESTAMP, nullable=True))
@@ -1,4 +1,5 @@
 from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlalchemy import BigInteger
 from sqlalchemy.dialects import postgresql
 from uuid import uuid4, UUID
 from datetime import datetime
@@ -28,11 +29,20 @@ class Organization(OrganizationBase, table=True):
             primary_key=True,
         )
     )
-    user: "User" = Relationship(back_populates="organization", sa_relationship_kwargs={"lazy": "selectin", "uselist": False})
-    documents: List["Documents"] = Relationship(back_populates="organization", sa_relationship_kwargs={"lazy": "selectin"})
+    # bumped whenever the organization's cached answers are invalidated; an /ask only caches
+    # its answer if the version it read at the start is still current (see answer_cache)
+    answer_cache_version: int = Field(
+        default=0,
+        sa_column=Column(BigInteger, nullable=False, server_default="0"),
+    )
+    # Relationships never load implicitly ("raise"): get_current_user runs on every request and
+    # selectin used to pull every document, chunk embedding and audit log along with the user.
+    # Query related rows explicitly, or add selectinload(...) where an endpoint needs them.
+    user: "User" = Relationship(back_populates="organization", sa_relationship_kwargs={"lazy": "raise", "uselist": False})
+    documents: List["Documents"] = Relationship(back_populates="organization", sa_relationship_kwargs={"lazy": "raise"})
     # separate relationship for chunks (document embeddings)
-    chunks: List["DocumentChunk"] = Relationship(back_populates="organization", sa_relationship_kwargs={"lazy": "selectin"})
-    logs: List["AIAuditLogs"] = Relationship(back_populates="organization", sa_relationship_kwargs={"lazy": "selectin"})
+    chunks: List["DocumentChunk"] = Relationship(back_populates="organization", sa_relationship_kwargs={"lazy": "raise"})
+    logs: List["AIAuditLogs"] = Relationship(back_populates="organization", sa_relationship_kwargs={"lazy": "raise"})
 
 class OrganizationCreate(SQLModel):
     organization_name: str
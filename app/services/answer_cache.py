@@ -0,0 +1,111 @@
+"""
+Semantic answer cache for /chat/ask, scoped per organization.
+
+A question reuses a cached answer when its embedding is within
+ANSWER_CACHE_SIMILARITY_THRESHOLD (cosine) of a question answered before in the same
+organization. Entries live in Postgres so every worker shares them and an invalidation
+from any worker (document uploaded, replaced, deleted or re-embedded) applies everywhere.
+
+An /ask that was already running when the organization was invalidated must not cache its
+answer afterwards (it was built from the old documents). Invalidation bumps
+organizations.answer_cache_version; /ask reads the version before searching and
+store_answer() only inserts while it is unchanged.
+"""
+from typing import List, Optional
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import Float, bindparam, cast, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import answer_cache_settings
+from app.models.answer_cache import AnswerCacheEntry
+from app.models.organization import Organization
+
+
+async def answer_cache_version(session: AsyncSession, org_id: UUID) -> Optional[int]:
+    """Current invalidation version of an organization's cache; read it before searching."""
+    if not answer_cache_settings.ANSWER_CACHE_ENABLED:
+        return None
+    return await session.scalar(select(Organization.answer_cache_version).where(Organization.id == org_id))
+
+
+async def lookup_cached_answer(session: AsyncSession, org_id: UUID, query_embed: List[float]) -> Optional[AnswerCacheEntry]:
+    """Closest cached answer for this organization if it is similar enough, else None."""
+    if not answer_cache_settings.ANSWER_CACHE_ENABLED:
+        return None
+    # both sides are unit vectors: <#> is -cosine similarity
+    order_expr = AnswerCacheEntry.question_embedding.op("<#>")(bindparam("q"))
+    similarity = cast(-order_expr, Float)
+    fresh_after = datetime.utcnow() - timedelta(seconds=answer_cache_settings.ANSWER_CACHE_TTL_SECONDS)
+    stmt = (
+        select(AnswerCacheEntry, similarity.label("similarity"))
+        .where(AnswerCacheEntry.organization_id == org_id, AnswerCacheEntry.created_at >= fresh_after)
+        .order_by(order_expr)
+        .limit(1)
+    )
+    row = (await session.execute(stmt, {"q": query_embed})).first()
+    if row is None or row.similarity < answer_cache_settings.ANSWER_CACHE_SIMILARITY_THRESHOLD:
+        return None
+    return row[0]
+
+
+async def store_answer(session: AsyncSession,
+                       org_id: UUID,
+                       question: str,
+                       query_embed: List[float],
+                       answer: str,
+                       sources: Optional[list],
+                       version: Optional[int]):
+    """
+    Add an answer to the cache (committed by the caller) and trim the organization's oldest
+    entries. Skipped when the organization was invalidated since `version` was read.
+    """
+    if not answer_cache_settings.ANSWER_CACHE_ENABLED or version is None:
+        return
+    # FOR SHARE waits for an invalidation that is still in flight, and makes a later one wait
+    # for our commit (its DELETE then sees, and removes, this entry)
+    current = await session.scalar(
+        select(Organization.answer_cache_version)
+        .where(Organization.id == org_id)
+        .with_for_update(read=True)
+    )
+    if current != version:
+        return
+    session.add(AnswerCacheEntry(
+        organization_id=org_id,
+        question=question,
+        question_embedding=query_embed,
+        answer=answer,
+        sources=sources,
+    ))
+    keep = (
+        select(AnswerCacheEntry.id)
+        .where(AnswerCacheEntry.organization_id == org_id)
+        .order_by(AnswerCacheEntry.created_at.desc())
+        .limit(answer_cache_settings.ANSWER_CACHE_MAX_PER_ORG)
+    )
+    await session.execute(
+        delete(AnswerCacheEntry).where(
+            AnswerCacheEntry.organization_id == org_id,
+            AnswerCacheEntry.id.not_in(keep),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+
+
+async def invalidate_organization(session: AsyncSession, org_id: Optional[UUID]):
+    """Drop every cached answer of an organization whose documents changed (committed by the caller)."""
+    if org_id is None:
+        return
+    # bump first: the row lock orders this against store_answer() (see there)
+    await session.execute(
+        update(Organization)
+        .where(Organization.id == org_id)
+        .values(answer_cache_version=Organization.answer_cache_version + 1),
+        execution_options={"synchronize_session": False},
+    )
+    await session.execute(
+        delete(AnswerCacheEntry).where(AnswerCacheEntry.organization_id == org_id),
+        execution_options={"synchronize_session": False},
+    )
@@ -0,0 +1,146 @@
+"""
+Background writer for ai_audit_logs.
+
+Request handlers hand AIAuditLogs records to `audit_sink.submit()` and return right away.
+A single task drains the in-memory queue and writes records with one multi-row INSERT per
+batch, whenever AUDIT_BATCH_SIZE records are waiting or AUDIT_FLUSH_INTERVAL_SECONDS has
+passed. The queue is bounded: when full, submit() waits up to AUDIT_ENQUEUE_TIMEOUT_SECONDS
+and then drops the record (counted in stats) rather than stalling requests. stop() flushes
+everything still queued, so a graceful shutdown loses nothing. A batch rejected because of
+its data (e.g. a record whose organization was deleted meanwhile) is retried in halves, so
+only the offending records are lost.
+"""
+from typing import List, Optional
+from uuid import uuid4
+import asyncio
+import logging
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.config import audit_settings
+from app.database.session import engine
+from app.models.ai_audit_logs import AIAuditLogs
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditSink:
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float, enqueue_timeout: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @staticmethod
+    def _row(audit: AIAuditLogs) -> dict:
+        row = audit.model_dump()
+        if row.get("id") is None:
+            row["id"] = uuid4()
+        return row
+
+    async def submit(self, audit: AIAuditLogs):
+        row = self._row(audit)
+        try:
+            self._queue.put_nowait(row)
+            return
+        except asyncio.QueueFull:
+            pass
+        try:
+            await asyncio.wait_for(self._queue.put(row), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            logger.warning("audit queue full, dropped audit record for organization %s", row.get("organization_id"))
+
+    async def _insert(self, rows: List[dict]):
+        async with engine.begin() as connection:
+            # executemany -> batched multi-row INSERT ... VALUES on asyncpg
+            await connection.execute(insert(AIAuditLogs.__table__), rows)
+
+    async def _flush(self, rows: List[dict]):
+        if not rows:
+            return
+        try:
+            await self._insert(rows)
+            self.written += len(rows)
+        except (IntegrityError, DataError):
+            if len(rows) == 1:
+                self.failed += 1
+                logger.exception("rejected audit record for organization %s", rows[0].get("organization_id"))
+                return
+            # the whole INSERT was rolled back; split until the bad records are isolated
+            middle = len(rows) // 2
+            await self._flush(rows[:middle])
+            await self._flush(rows[middle:])
+        except Exception:
+            # database unavailable etc.: retrying row by row would only fail the same way
+            self.failed += len(rows)
+            logger.exception("failed to write %s audit records", len(rows))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stop:
+                return
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything queued so far and stop the writer."""
+        if self._task is None:
+            return
+        # queued after every pending record, so they are all written first
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        # anything submitted while stopping
+        leftover = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        for i in range(0, len(leftover), self.batch_size):
+            await self._flush(leftover[i:i + self.batch_size])
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+audit_sink = AuditSink(
+    max_queue=audit_settings.AUDIT_QUEUE_MAX,
+    batch_size=audit_settings.AUDIT_BATCH_SIZE,
+    flush_interval=audit_settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    enqueue_timeout=audit_settings.AUDIT_ENQUEUE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,56 @@
+"""
+Re-normalize stored chunk embeddings in bulk.
+
+Chunks ingested before normalization was shared with embed_text hold raw vectors, which
+rank wrong under the inner-product (<#>) search. This walks document_chunks in id order
+and rewrites un-normalized rows server-side with pgvector's l2_normalize() (pgvector >= 0.7),
+one committed batch at a time, so vectors never leave the database and locks stay short.
+
+    python -m app.services.backfill_embeddings [--batch-size 5000]
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from app.database.session import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+# |norm - 1| above this is treated as un-normalized (float32 rounding stays well below)
+NORM_TOLERANCE = 1e-4
+
+_next_ids = text(
+    "SELECT id FROM document_chunks WHERE (CAST(:last_id AS uuid) IS NULL OR id > :last_id) ORDER BY id LIMIT :batch_size"
+)
+_normalize = text(
+    "UPDATE document_chunks SET embedding = l2_normalize(embedding) "
+    "WHERE id = ANY(:ids) AND abs(vector_norm(embedding) - 1) > :tolerance"
+)
+
+
+async def renormalize_embeddings(batch_size: int = 5000) -> int:
+    """Normalize every stored embedding that is not unit length; returns rows updated."""
+    last_id = None
+    updated = 0
+    async with async_session_maker() as session:
+        while True:
+            ids = (await session.execute(_next_ids, {"last_id": last_id, "batch_size": batch_size})).scalars().all()
+            if not ids:
+                break
+            result = await session.execute(_normalize, {"ids": list(ids), "tolerance": NORM_TOLERANCE})
+            await session.commit()
+            updated += result.rowcount or 0
+            last_id = ids[-1]
+            logger.info("re-normalized %s rows so far (up to id %s)", updated, last_id)
+    return updated
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Re-normalize stored document_chunks embeddings.")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    total = asyncio.run(renormalize_embeddings(args.batch_size))
+    print(f"re-normalized {total} embeddings")
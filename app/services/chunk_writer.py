@@ -0,0 +1,163 @@
+"""
+Bulk writer for document_chunks.
+
+Ingestion used to add one DocumentChunk ORM object per chunk and flush them as per-row
+INSERTs. Rows are now streamed with COPY ... FROM STDIN (FORMAT binary) on the session's
+own asyncpg connection (same transaction as the caller), with embeddings in pgvector's
+binary wire format. The binary stream is encoded here so no per-connection type codec has
+to be registered. CHUNK_WRITER=insert falls back to core insert() executemany batches.
+"""
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List
+from datetime import datetime
+from uuid import UUID
+import json
+import struct
+
+import numpy as np
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ingestion_settings
+from app.models.documents import DocumentChunk, Documents
+
+_PG_EPOCH = datetime(2000, 1, 1)
+_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_TRAILER = struct.pack("!h", -1)
+_NULL = struct.pack("!i", -1)
+
+
+def _uuid(value: UUID) -> bytes:
+    return value.bytes
+
+
+def _text(value: str) -> bytes:
+    return value.encode("utf-8")
+
+
+def _jsonb(value: Any) -> bytes:
+    # jsonb binary format: version byte 1 followed by the JSON text
+    return b"\x01" + json.dumps(value, default=str).encode("utf-8")
+
+
+def _int4(value: int) -> bytes:
+    return struct.pack("!i", value)
+
+
+def _int8(value: int) -> bytes:
+    return struct.pack("!q", value)
+
+
+def _timestamp(value: datetime) -> bytes:
+    delta = value.replace(tzinfo=None) - _PG_EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return struct.pack("!q", micros)
+
+
+def _vector(value) -> bytes:
+    # pgvector binary format: dim (int16), unused (int16), dim x float4, all big-endian
+    if isinstance(value, np.ndarray):
+        return struct.pack("!hh", value.shape[0], 0) + value.astype(">f4", copy=False).tobytes()
+    # embedder output is a list of floats; struct is ~2x faster than a numpy round trip here
+    return struct.pack(f"!hh{len(value)}f", len(value), 0, *value)
+
+
+# column name -> field encoder; order is the COPY column order
+CHUNK_COLUMNS: Dict[str, Callable[[Any], bytes]] = {
+    "id": _uuid,
+    "document_id": _uuid,
+    "generation": _int8,
+    "organization_id": _uuid,
+    "content": _text,
+    "content_hash": _text,
+    "embedding": _vector,
+    "metadata": _jsonb,
+    "chunk_index": _int4,
+    "content_length": _int4,
+    "created_at": _timestamp,
+}
+
+
+def encode_copy_rows(rows: Iterable[dict], columns: Dict[str, Callable[[Any], bytes]] = CHUNK_COLUMNS) -> bytes:
+    """PGCOPY binary tuples (no header/trailer) for `rows`, dicts keyed by column name."""
+    ncols = struct.pack("!h", len(columns))
+    out = bytearray()
+    for row in rows:
+        out += ncols
+        for name, encode in columns.items():
+            value = row.get(name)
+            if value is None:
+                out += _NULL
+                continue
+            field = encode(value)
+            out += struct.pack("!i", len(field))
+            out += field
+    return bytes(out)
+
+
+async def _copy_stream(rows: List[dict], batch_size: int) -> AsyncIterator[bytes]:
+    yield _HEADER
+    for start in range(0, len(rows), batch_size):
+        yield encode_copy_rows(rows[start:start + batch_size])
+    yield _TRAILER
+
+
+async def copy_chunks(session: AsyncSession, rows: List[dict], batch_size: int = 1000) -> int:
+    """COPY `rows` into document_chunks inside the session's current transaction."""
+    if not rows:
+        return 0
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    driver = raw.driver_connection
+    if not driver.is_in_transaction():
+        # the asyncpg adapter only sends BEGIN with the first statement; without it the
+        # COPY would autocommit on its own instead of with the caller's commit/rollback
+        await connection.exec_driver_sql("SELECT 1")
+    await driver.copy_to_table(
+        DocumentChunk.__tablename__,
+        source=_copy_stream(rows, batch_size),
+        columns=list(CHUNK_COLUMNS),
+        format="binary",
+    )
+    return len(rows)
+
+
+async def insert_chunks(session: AsyncSession, rows: List[dict], batch_size: int = 1000) -> int:
+    """Fallback: core insert() executemany in batches (no ORM unit of work)."""
+    table = DocumentChunk.__table__
+    for start in range(0, len(rows), batch_size):
+        await session.execute(insert(table), rows[start:start + batch_size])
+    return len(rows)
+
+
+async def write_chunks(session: AsyncSession, rows: List[dict]) -> int:
+    """Write chunk rows (keys = document_chunks column names); the caller commits."""
+    if ingestion_settings.CHUNK_WRITER == "insert":
+        return await insert_chunks(session, rows, ingestion_settings.CHUNK_WRITE_BATCH_SIZE)
+    return await copy_chunks(session, rows, ingestion_settings.CHUNK_WRITE_BATCH_SIZE)
+
+
+async def activate_generation(session: AsyncSession, document_id: UUID, generation: int, embedded_at: datetime) -> bool:
+    """
+    Point the document at chunk `generation` and delete its older chunk generations with one
+    set-based DELETE; the caller commits, so searches see either the old or the new set.
+    Returns False (and drops `generation`) when a newer generation already went live.
+    """
+    result = await session.execute(
+        update(Documents)
+        .where(Documents.id == document_id, Documents.active_generation < generation)
+        .values(active_generation=generation, last_embedded_at=embedded_at)
+        .returning(Documents.id),
+        execution_options={"synchronize_session": False},
+    )
+    if result.scalar_one_or_none() is None:
+        # a later upload of the same document finished first; its chunks stay
+        await session.execute(
+            delete(DocumentChunk).where(DocumentChunk.document_id == document_id, DocumentChunk.generation == generation),
+            execution_options={"synchronize_session": False},
+        )
+        return False
+    await session.execute(
+        delete(DocumentChunk).where(DocumentChunk.document_id == document_id, DocumentChunk.generation < generation),
+        execution_options={"synchronize_session": False},
+    )
+    return True
@@ -1,30 +1,159 @@
-from typing import List
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
 import math
-from app.config import llm_settings
+import random
+from app.config import embedding_settings, llm_settings
+from app.services.embedding_cache import EmbeddingCache, PostgresEmbeddingStore, normalize_text
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 EMBED_DIM = 768  # keep in sync with model + DB (also gemini-embedding-001)
+EMBED_MODEL = "models/gemini-embedding-001"
+
+# Stored chunks were always embedded with the query task type; keep batches on the
+# same task type so documents and questions live in the same vector space.
+EMBED_TASK_TYPE = "RETRIEVAL_QUERY"
+
+
+class FakeEmbeddings:
+    """
+    Deterministic offline stand-in for GoogleGenerativeAIEmbeddings.
+
+    The same text always maps to the same vector, so ordering and batching can be
+    checked without network access. Every embed_documents call is recorded in
+    `calls` (one entry per batch, holding the batch texts).
+    """
+
+    def __init__(self, dim: int = EMBED_DIM):
+        self.dim = dim
+        self.calls: List[List[str]] = []
+
+    def _vector(self, text: str, dim: int) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        return [rng.gauss(0.0, 1.0) for _ in range(dim)]
+
+    def embed_query(self, text: str, *, output_dimensionality: Optional[int] = None, **kwargs) -> List[float]:
+        return self._vector(text, output_dimensionality or self.dim)
+
+    def embed_documents(self, texts: List[str], *, output_dimensionality: Optional[int] = None, **kwargs) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [self._vector(t, output_dimensionality or self.dim) for t in texts]
+
+
+def normalize_vector(vec: List[float]) -> List[float]:
+    """
+    Validate the dimension and L2-normalize. Every stored and query vector goes through
+    this, so inner product (<#>) == cosine similarity in vector_search.
+    """
+    if len(vec) != EMBED_DIM:
+        raise ValueError(f"unexpected embedding dim: {len(vec)} != {EMBED_DIM}")
+    norm = math.sqrt(sum(x * x for x in vec))
+    if norm > 0:
+        vec = [x / norm for x in vec]
+    return vec
+
+
+class AsyncEmbedder:
+    """
+    Async front for a sync embedding client (GoogleGenerativeAIEmbeddings / FakeEmbeddings).
+
+    Calls run on a dedicated, bounded thread pool instead of the event loop (or the shared
+    default executor), at most `max_in_flight` at a time, each with a timeout. Cancelling
+    the awaiting task (client disconnect, timeout) frees its slot right away; the thread
+    finishes the HTTP call in the background and its result is dropped.
+    """
+
+    def __init__(self, embedder, *, thread_pool_size: int, max_in_flight: int, timeout: Optional[float]):
+        self.embedder = embedder
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=thread_pool_size, thread_name_prefix="embedder")
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def _run(self, fn, *args, **kwargs):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+            return await asyncio.wait_for(call, timeout=self.timeout)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._run(self.embedder.embed_query, text, output_dimensionality=EMBED_DIM)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._run(
+            self.embedder.embed_documents,
+            texts,
+            batch_size=len(texts),  # one API call per batch
+            task_type=EMBED_TASK_TYPE,
+            output_dimensionality=EMBED_DIM,
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
 
 # create one place to call embeddings & normalize
 _embeddings = None
+_async_embedder: Optional[AsyncEmbedder] = None
 
 def _get_embedder():
     global _embeddings
     if _embeddings is None:
-        _embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001",
-            google_api_key=llm_settings.GEMINI_API_KEY,
-        )
+        if embedding_settings.EMBEDDING_PROVIDER == "fake":
+            _embeddings = FakeEmbeddings()
+        else:
+            _embeddings = GoogleGenerativeAIEmbeddings(
+                model=EMBED_MODEL,
+                google_api_key=llm_settings.GEMINI_API_KEY,
+            )
     return _embeddings
 
+def get_async_embedder() -> AsyncEmbedder:
+    global _async_embedder
+    if _async_embedder is None:
+        _async_embedder = AsyncEmbedder(
+            _get_embedder(),
+            thread_pool_size=embedding_settings.EMBED_THREAD_POOL_SIZE,
+            max_in_flight=embedding_settings.EMBED_MAX_IN_FLIGHT,
+            timeout=embedding_settings.EMBED_TIMEOUT_SECONDS,
+        )
+    return _async_embedder
+
+def shutdown_async_embedder():
+    global _async_embedder
+    if _async_embedder is not None:
+        _async_embedder.shutdown()
+        _async_embedder = None
+
+def embedding_model_id() -> str:
+    """Identifies which model produced a vector (cache keys must not mix providers)."""
+    return "fake" if embedding_settings.EMBEDDING_PROVIDER == "fake" else EMBED_MODEL
+
+# Global embedding dedup store (None when disabled), shared by embed_text and ingestion
+embedding_store = (
+    PostgresEmbeddingStore(
+        max_rows=embedding_settings.EMBED_STORE_MAX_ROWS,
+        flush_interval=embedding_settings.EMBED_STORE_FLUSH_INTERVAL_SECONDS,
+        evict_interval=embedding_settings.EMBED_STORE_EVICT_INTERVAL_SECONDS,
+    )
+    if embedding_settings.EMBED_CACHE_SHARED_BACKEND == "postgres" else None
+)
+
+query_embedding_cache = EmbeddingCache(
+    model=embedding_model_id(),
+    dimension=EMBED_DIM,
+    maxsize=embedding_settings.EMBED_CACHE_SIZE,
+    ttl=embedding_settings.EMBED_CACHE_TTL_SECONDS,
+    shared=embedding_store,
+)
+
 async def embed_text(text: str) -> List[float]:
-    embedder = _get_embedder()
-    vec = embedder.embed_query(text, output_dimensionality=768)  # #set dim to 768 for gemini-embedding-001
-    # validate
-    if len(vec) != EMBED_DIM:
-        raise ValueError(f"unexpected embedding dim: {len(vec)} != {EMBED_DIM}")
-    # normalize for cosine if you plan to use cosine; otherwise skip
-    norm = math.sqrt(sum(x * x for x in vec))
-    if norm > 0:
-        vec = [x / norm for x in vec]
-    return vec
\ No newline at end of file
+    normalized = normalize_text(text)
+    vec = await query_embedding_cache.get(normalized)
+    if vec is not None:
+        return vec
+    vec = normalize_vector(await get_async_embedder().aembed_query(normalized))  # dim 768 for gemini-embedding-001
+    query_embedding_cache.put(normalized, vec)
+    return vec
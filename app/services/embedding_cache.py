@@ -0,0 +1,283 @@
+"""
+Query embedding cache: in-process LRU + TTL tier, optionally backed by a shared Postgres
+tier (embedding_cache table) so every worker benefits from every other worker's misses.
+The same table is the global dedup store for ingestion: text embedded once, for any
+organization or question, is never sent to the embedder again while it is stored.
+
+Keys are (model, dimension, sha256(normalized text)), so switching the embedding model or
+dimension never serves stale vectors.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+import asyncio
+import hashlib
+import logging
+import re
+import unicodedata
+
+from sqlalchemy import String, any_, bindparam, delete, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.session import async_session_maker
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (and embedded): NFKC, single spaces, trimmed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def text_hash(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class PostgresEmbeddingStore:
+    """
+    Shared tier and global dedup store: one row per (model, dimension, text_hash) in
+    embedding_cache, consulted by embed_text and by ingestion before calling the embedder.
+
+    Lookups only read. Hits are counted in memory and a background task (start/stop)
+    writes them as one batched UPDATE of last_used_at / hit_count every `flush_interval`
+    seconds, and every `evict_interval` seconds deletes the least recently used rows beyond
+    `max_rows` (0 = unbounded).
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 0,
+        flush_interval: float = 30.0,
+        evict_interval: float = 600.0,
+        evict_batch_size: int = 10000,
+        max_pending_touches: int = 100000,
+    ):
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.evict_interval = evict_interval
+        self.evict_batch_size = evict_batch_size
+        self.max_pending_touches = max_pending_touches
+        self.lookups = 0
+        self.hits = 0
+        self.written = 0
+        self.evicted = 0
+        # (model, dimension, text_hash) -> hits not yet written
+        self._touched: Dict[Tuple[str, int, str], int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    @staticmethod
+    def _where(model: str, dimension: int):
+        # the text hashes are bound at execute time as "keys"
+        return (
+            EmbeddingCacheEntry.model == model,
+            EmbeddingCacheEntry.dimension == dimension,
+            # one array parameter, whatever the number of keys
+            EmbeddingCacheEntry.text_hash == any_(bindparam("keys", type_=postgresql.ARRAY(String))),
+        )
+
+    async def get_many(self, model: str, dimension: int, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).where(*self._where(model, dimension)),
+                {"keys": keys},
+            )
+            found = {key: [float(x) for x in embedding] for key, embedding in result.all()}
+        self._touch(model, dimension, found)
+        self.lookups += len(keys)
+        self.hits += len(found)
+        return found
+
+    async def get(self, model: str, dimension: int, key: str) -> Optional[List[float]]:
+        return (await self.get_many(model, dimension, [key])).get(key)
+
+    async def set_many(self, model: str, dimension: int, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {"model": model, "dimension": dimension, "text_hash": key, "embedding": embedding,
+             "created_at": now, "last_used_at": now, "hit_count": 0}
+            for key, embedding in items.items()
+        ]
+        async with async_session_maker() as session:
+            # executemany; batched into multi-row INSERTs by SQLAlchemy
+            await session.execute(insert(EmbeddingCacheEntry).on_conflict_do_nothing(), rows)
+            await session.commit()
+        self.written += len(rows)
+
+    async def set(self, model: str, dimension: int, key: str, embedding: List[float]):
+        await self.set_many(model, dimension, {key: embedding})
+
+    def _touch(self, model: str, dimension: int, keys: Iterable[str]):
+        for key in keys:
+            touched = (model, dimension, key)
+            if touched in self._touched:
+                self._touched[touched] += 1
+            elif len(self._touched) < self.max_pending_touches:
+                # beyond the cap a hit only loses its recency bump until the next flush
+                self._touched[touched] = 1
+
+    async def flush_touches(self) -> int:
+        """Write the recency + reuse counters collected since the last flush; returns rows."""
+        touched, self._touched = self._touched, {}
+        if not touched:
+            return 0
+        table = EmbeddingCacheEntry.__table__
+        stmt = (
+            update(table)
+            .where(
+                table.c.model == bindparam("b_model"),
+                table.c.dimension == bindparam("b_dimension"),
+                table.c.text_hash == bindparam("b_text_hash"),
+            )
+            .values(last_used_at=func.now(), hit_count=table.c.hit_count + bindparam("b_hits"))
+        )
+        rows = [
+            {"b_model": model, "b_dimension": dimension, "b_text_hash": key, "b_hits": hits}
+            for (model, dimension, key), hits in touched.items()
+        ]
+        async with async_session_maker() as session:
+            # one executemany for the whole interval
+            await session.execute(stmt, rows)
+            await session.commit()
+        return len(rows)
+
+    async def evict(self) -> int:
+        """
+        Delete the least recently used rows beyond max_rows; returns how many. The row count
+        is exact: planner statistics (pg_class.reltuples) only change on VACUUM / ANALYZE, so
+        after a pass they still include the evicted rows and the next pass would evict again.
+        The table is bounded by max_rows, which keeps count(*) cheap. Rows are deleted oldest
+        first in batches walking the last_used_at index, so nothing sorts the whole table.
+        """
+        if self.max_rows <= 0:
+            return 0
+        table = EmbeddingCacheEntry.__table__
+        evicted = 0
+        async with async_session_maker() as session:
+            rows = await session.scalar(select(func.count()).select_from(table))
+            excess = rows - self.max_rows
+            while excess > 0:
+                oldest = (
+                    select(table.c.model, table.c.dimension, table.c.text_hash)
+                    .order_by(table.c.last_used_at)
+                    .limit(min(excess, self.evict_batch_size))
+                )
+                result = await session.execute(
+                    delete(table).where(tuple_(table.c.model, table.c.dimension, table.c.text_hash).in_(oldest))
+                )
+                await session.commit()
+                deleted = result.rowcount or 0
+                if not deleted:
+                    break
+                evicted += deleted
+                excess -= deleted
+        self.evicted += evicted
+        return evicted
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_evict = loop.time() + self.evict_interval
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush_touches()
+                if loop.time() >= next_evict:
+                    next_evict = loop.time() + self.evict_interval
+                    await self.evict()
+            except Exception:
+                logger.warning("embedding store maintenance failed", exc_info=True)
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write pending counters and stop the maintenance task."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            # share of texts that did not have to be embedded again
+            "reuse_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "written": self.written,
+            "evicted": self.evicted,
+            "max_rows": self.max_rows,
+            "pending_touches": len(self._touched),
+        }
+
+
+class EmbeddingCache:
+    def __init__(self, model: str, dimension: int, maxsize: int, ttl: Optional[float], shared: Optional[PostgresEmbeddingStore] = None):
+        self.model = model
+        self.dimension = dimension
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self._pending_writes: Set[asyncio.Task] = set()
+
+    def _key(self, normalized: str) -> str:
+        return text_hash(normalized)
+
+    async def get(self, normalized: str) -> Optional[List[float]]:
+        key = self._key(normalized)
+        vec = self.local.get(key)
+        if vec is not None or self.shared is None:
+            return vec
+        try:
+            vec = await self.shared.get(self.model, self.dimension, key)
+        except Exception:
+            # the shared tier is an optimization; never fail a question because of it
+            logger.warning("shared embedding cache lookup failed", exc_info=True)
+            vec = None
+        if vec is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        self.local.set(key, vec)
+        return vec
+
+    def put(self, normalized: str, vec: List[float]):
+        key = self._key(normalized)
+        self.local.set(key, vec)
+        if self.shared is not None:
+            # write-behind so the caller does not wait on the insert
+            task = asyncio.create_task(self._write_shared(key, vec))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
+
+    async def _write_shared(self, key: str, vec: List[float]):
+        try:
+            await self.shared.set(self.model, self.dimension, key, vec)
+        except Exception:
+            logger.warning("shared embedding cache write failed", exc_info=True)
+
+    def stats(self) -> dict:
+        local = self.local.stats()
+        return {
+            "model": self.model,
+            "dimension": self.dimension,
+            "local": local,
+            "shared": None if self.shared is None else {"hits": self.shared_hits, "misses": self.shared_misses},
+            # every miss on both tiers is one embedding API call
+            "embedding_calls_saved": local["hits"] + self.shared_hits,
+        }
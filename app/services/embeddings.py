@@ -1,20 +1,44 @@
-from typing import List
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime
-import tempfile
+from uuid import UUID, uuid4
+import asyncio
+import collections
 import logging
-import io
-import contextlib
+import os
+import tempfile
 
+from sqlalchemy import String, any_, bindparam, delete
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.documents import Document as LCDocument
 
-from app.config import aws_settings, llm_settings
-from app.utils.s3 import s3_client
-from app.models.documents import Documents, DocumentChunk
+from app.config import embedding_settings, ingestion_settings
+from app.database.session import async_session_maker
+from app.utils.storage import storage
+from app.models.documents import Documents, DocumentChunk, chunk_generation_seq
+from app.services.embedder import (
+    EMBED_DIM,
+    AsyncEmbedder,
+    embedding_model_id,
+    embedding_store,
+    get_async_embedder,
+    normalize_vector,
+)
+from app.services.chunk_writer import activate_generation, write_chunks
+from app.services.embedding_cache import normalize_text, text_hash
+from app.services.ingestion_spool import remove_spool, spool_dir
+from app.services.pdf_pages import (
+    count_pdf_pages,
+    get_parse_executor,
+    iter_pdf_pages,
+    make_splitter,
+    open_pdf_source,
+    split_pdf_pages,
+)
+
+logger = logging.getLogger(__name__)
 
 # mute extra logs on terminal, only if error.
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
@@ -22,118 +46,368 @@ logging.getLogger("unstructured").setLevel(logging.ERROR)
 logging.getLogger("pypdf").setLevel(logging.ERROR)
 
 
-async def process_and_embed_single_document(session: AsyncSession, document: Documents) -> dict:
+async def embed_in_batches(
+    texts: List[str],
+    embedder: Optional[AsyncEmbedder] = None,
+    *,
+    batch_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    on_batch_done: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> List[List[float]]:
     """
-    Load one document file from S3, split into chunks, embed with Gemini,
-    and store chunks+embeddings in document_chunks (FK -> documents.id).
+    Embed `texts` with one embed_documents call per batch of `batch_size` texts,
+    running at most `max_concurrency` batches at the same time.
+    `on_batch_done` (if given) is awaited with the size of each finished batch.
 
-    This is designed to be called right after a successful upload DB insert
-    in the /documents/upload route.
+    Returned vectors are L2-normalized (same stage as embed_text) and in the same order
+    as `texts`, whatever order the batches finish in.
     """
-    storage_key = document.storage_key
-    if not storage_key or not storage_key.lower().endswith(".pdf"):
-        # Extend here in future if needed e.g .txt format
-        return {"document_id": str(document.id), "chunks": 0, "detail": "Unsupported or missing storage_key"}
-
-    # 1) Download file from S3 to temp file and load pages
-    docs = []
-    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
-        s3_client.download_fileobj(aws_settings.AWS_S3_BUCKET, storage_key, tmp)
-        tmp.flush()
-
-        pdf_loader = PyPDFLoader(tmp.name)
-
-        # suppress loader stdout/stderr
-        f_stdout = io.StringIO()
-        f_stderr = io.StringIO()
-        with contextlib.redirect_stdout(f_stdout), contextlib.redirect_stderr(f_stderr):
-            page_docs = pdf_loader.load()
-
-        # attach metadata
-        for i, d in enumerate(page_docs, start=1):
-            d.metadata = d.metadata or {}
-            # ensure we always store both the S3 storage_key and the original filename
-            d.metadata["source"] = d.metadata.get("source") or storage_key
-            d.metadata["s3_key"] = d.metadata.get("s3_key") or storage_key
-            d.metadata["page"] = d.metadata.get("page") or i
-        docs.extend(page_docs)
-
-    if not docs:
-        return {"document_id": str(document.id), "chunks": 0, "detail": "No pages extracted"}
-
-    # 2) Split into chunks
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        add_start_index=True,
-    )
-    all_splits = splitter.split_documents(docs)
+    embedder = embedder or get_async_embedder()
+    batch_size = batch_size or embedding_settings.EMBED_BATCH_SIZE
+    max_concurrency = max_concurrency or embedding_settings.EMBED_MAX_CONCURRENCY
+    if batch_size < 1 or max_concurrency < 1:
+        raise ValueError("batch_size and max_concurrency must be >= 1")
 
-    # 3) Embed with Gemini
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/gemini-embedding-001",
-        google_api_key=llm_settings.GEMINI_API_KEY,
-    )
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    semaphore = asyncio.Semaphore(max_concurrency)
 
-    # Optional: if this function is called on a doc that somehow already has chunks,
-    # clean them first (safety; normally not needed because upload route recreates doc row)
-    existing_chunks_stmt = select(DocumentChunk).where(DocumentChunk.document_id == document.id)
-    existing_result = await session.execute(existing_chunks_stmt)
-    existing_chunks = existing_result.scalars().all()
-    if existing_chunks:
-        for c in existing_chunks:
-            session.delete(c)
-        await session.commit()
+    async def _embed_batch(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            vectors = await embedder.aembed_documents(batch)
+        if on_batch_done is not None:
+            await on_batch_done(len(batch))
+        return vectors
+
+    results = await asyncio.gather(*(_embed_batch(b) for b in batches))
+
+    vectors = [normalize_vector(vec) for batch_vectors in results for vec in batch_vectors]
+    if len(vectors) != len(texts):
+        raise ValueError(f"embedder returned {len(vectors)} vectors for {len(texts)} texts")
+    return vectors
+
+
+async def embed_deduplicated(
+    texts: List[str],
+    *,
+    on_batch_done: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> List[List[float]]:
+    """
+    Embed `texts` through the global dedup store (embedder.embedding_store): text already
+    embedded for any document or question (same model, dimension and normalized text) is
+    reused, only the rest goes to embed_in_batches and is then added to the store.
+    """
+    normalized = [normalize_text(text) for text in texts]
+    keys = [text_hash(text) for text in normalized]
+    model = embedding_model_id()
+    found: Dict[str, List[float]] = {}
+    if embedding_store is not None and keys:
+        try:
+            found = await embedding_store.get_many(model, EMBED_DIM, keys)
+        except Exception:
+            # the store is an optimization; embed everything rather than fail the job
+            logger.warning("embedding store lookup failed", exc_info=True)
+    missing = list(dict.fromkeys(text for text, key in zip(normalized, keys) if key not in found))
+    if on_batch_done is not None and len(texts) > len(missing):
+        await on_batch_done(len(texts) - len(missing))
 
-    created = 0
-    for i, chunk in enumerate(all_splits):
-        text = chunk.page_content.strip()
-        # sanitize text: remove NULs and ensure valid UTF-8
-        if "\x00" in text:
-            # remove NUL bytes that break Postgres UTF-8 encoding
-            text = text.replace("\x00", "")
+    vectors = await embed_in_batches(missing, on_batch_done=on_batch_done)
+    new_items = {text_hash(text): vector for text, vector in zip(missing, vectors)}
+    if embedding_store is not None and new_items:
         try:
-            # ensure encodable to utf-8, replace invalid sequences
-            text = text.encode("utf-8", "replace").decode("utf-8")
+            await embedding_store.set_many(model, EMBED_DIM, new_items)
         except Exception:
-            text = "".join(ch for ch in text if ord(ch) != 0)
-
-        if not text:
-            continue
-
-        vector = embeddings.embed_query(text, output_dimensionality=768)  # set dim to 768.
-
-        # basic chunk metadata and indexes (explicit fallbacks so existing None values are replaced)
-        chunk_meta = dict(chunk.metadata or {})
-        chunk_meta["page"] = chunk_meta.get("page") or chunk_meta.get("page", None)
-        chunk_meta["source"] = chunk_meta.get("source") or storage_key
-        chunk_meta["s3_key"] = chunk_meta.get("s3_key") or storage_key
-        chunk_meta["splitter_start_index"] = chunk_meta.get("splitter_start_index") or getattr(chunk, "start_index", None)
-
-        dc = DocumentChunk(
-            document_id=document.id,
-            content=text,
-            embedding=vector,
-            organization_id=document.organization_id,
-            raw_metadata=chunk_meta,
-            chunk_index=i,
-            content_length=len(text),
+            logger.warning("embedding store write failed", exc_info=True)
+    found.update(new_items)
+    return [found[key] for key in keys]
+
+
+async def load_live_embeddings(session: AsyncSession, document_id: UUID, hashes: Set[str]) -> Dict[str, List[float]]:
+    """content_hash -> embedding for the document's live chunks whose hash is in `hashes`."""
+    if not hashes:
+        return {}
+    stmt = (
+        select(DocumentChunk.content_hash, DocumentChunk.embedding)
+        .join(
+            Documents,
+            (DocumentChunk.document_id == Documents.id) & (DocumentChunk.generation == Documents.active_generation),
+        )
+        .where(
+            DocumentChunk.document_id == document_id,
+            # one array parameter, whatever the number of chunks
+            DocumentChunk.content_hash == any_(bindparam("hashes", type_=postgresql.ARRAY(String))),
         )
-        session.add(dc)
-        created += 1
+    )
+    result = await session.execute(stmt, {"hashes": list(hashes)})
+    return {content_hash: embedding for content_hash, embedding in result.all()}
+
+
+def _sanitize(text: str) -> str:
+    text = text.strip()
+    # sanitize text: remove NULs and ensure valid UTF-8
+    if "\x00" in text:
+        # remove NUL bytes that break Postgres UTF-8 encoding
+        text = text.replace("\x00", "")
+    try:
+        # ensure encodable to utf-8, replace invalid sequences
+        text = text.encode("utf-8", "replace").decode("utf-8")
+    except Exception:
+        text = "".join(ch for ch in text if ord(ch) != 0)
+    return text
+
+
+def _open_pdf_pages(storage_key: str, source_path: Optional[str]):
+    # seekable ranged reads (or the local upload copy) instead of downloading to a temp file
+    return iter_pdf_pages(open_pdf_source(storage_key, source_path), storage_key)
+
+
+async def _split_pages(storage_key: str, source_path: Optional[str] = None) -> AsyncIterator[Tuple[int, List[LCDocument]]]:
+    """
+    Yield (pages read, their chunks) in document order.
+
+    With a parse process pool, page ranges are parsed and split in worker processes, up to
+    two ranges per process in flight, and consumed in order. The workers read `source_path`
+    or, without one, the stored object with ranged reads (a local copy of it made for this
+    job with INGESTION_PARSE_LOCAL_COPY). Otherwise pages are parsed one at a time in a
+    thread (ranged reads, one pass) and split here.
+    """
+    executor = get_parse_executor()
+    if executor is None:
+        splitter = make_splitter()
+        pages = await asyncio.to_thread(_open_pdf_pages, storage_key, source_path)
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return
+            yield 1, splitter.split_documents([page])
+
+    local_copy = None
+    if source_path is None and ingestion_settings.INGESTION_PARSE_LOCAL_COPY:
+        # every range task opens its own PdfReader, which reads the xref and page tree again
+        # over ranged storage reads; opt-in: the tasks share one local copy downloaded once
+        fd, local_copy = tempfile.mkstemp(dir=spool_dir(), suffix=".pdf")
+        os.close(fd)
+        source_path = local_copy
+    loop = asyncio.get_running_loop()
+    in_flight = collections.deque()
+    try:
+        if local_copy is not None:
+            await storage.download_to_path(storage_key, local_copy)
+        total_pages = await loop.run_in_executor(executor, count_pdf_pages, storage_key, source_path)
+        step = max(ingestion_settings.INGESTION_PARSE_PAGES_PER_TASK, 1)
+        ranges = iter([(start, min(start + step, total_pages)) for start in range(0, total_pages, step)])
+        max_in_flight = 2 * max(ingestion_settings.INGESTION_PARSE_PROCESSES, 1)
+        while True:
+            while len(in_flight) < max_in_flight:
+                page_range = next(ranges, None)
+                if page_range is None:
+                    break
+                future = loop.run_in_executor(executor, split_pdf_pages, storage_key, *page_range, source_path)
+                in_flight.append((page_range, future))
+            if not in_flight:
+                return
+            (start, stop), future = in_flight.popleft()
+            chunks = await future
+            yield stop - start, [LCDocument(page_content=text, metadata=meta) for text, meta in chunks]
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        remove_spool(local_copy)
+
 
-        # Commit in small batches to keep memory stable
-        if created % 200 == 0:
+_DONE = object()
+
+
+async def process_and_embed_single_document(
+    session: AsyncSession,
+    document: Documents,
+    progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    source_path: Optional[str] = None,
+) -> dict:
+    """
+    Stream one document file from S3, split into chunks, embed with Gemini,
+    and store chunks+embeddings in document_chunks (FK -> documents.id).
+
+    This is run by the ingestion workers (app/services/ingestion_queue.py) for each
+    job queued by the /documents/upload route. `progress` (if given) is awaited
+    with (chunks_embedded, chunks_seen_so_far) as embedding batches complete.
+
+    Stages run concurrently, connected by bounded queues, so memory stays flat whatever
+    the document size and embedding starts with the first pages:
+    parse + split (process pool) -> batches -> embed workers -> bulk writer.
+
+    Re-embedding writes a new chunk generation and swaps it in atomically
+    (chunk_writer.activate_generation); searches never see a partial chunk set.
+    Chunks whose text is unchanged (same content_hash as a live chunk) keep their
+    embedding; only new or changed text is sent to the embedder.
+
+    `source_path` is the upload's local copy (ingestion_spool); when this host can see it,
+    it is parsed instead of reading the object back from storage.
+    """
+    # read once: session.rollback() in the error path expires `document`
+    document_id, organization_id, storage_key = document.id, document.organization_id, document.storage_key
+    if not storage_key or not storage_key.lower().endswith(".pdf"):
+        # Extend here in future if needed e.g .txt format
+        return {"document_id": str(document_id), "chunks": 0, "detail": "Unsupported or missing storage_key"}
+
+    if source_path and not os.path.exists(source_path):
+        # queued on another host, or already cleaned up
+        source_path = None
+
+    # New chunks are written under a new generation, invisible to searches until activated
+    generation = await session.scalar(select(chunk_generation_seq.next_value()))
+    await session.commit()
+
+    batch_size = embedding_settings.EMBED_BATCH_SIZE
+    embed_workers = max(embedding_settings.EMBED_MAX_CONCURRENCY, 1)
+    batches: asyncio.Queue = asyncio.Queue(maxsize=ingestion_settings.INGESTION_PIPELINE_QUEUE_SIZE)
+    row_batches: asyncio.Queue = asyncio.Queue(maxsize=ingestion_settings.INGESTION_PIPELINE_QUEUE_SIZE)
+    counts = {"pages": 0, "chunks": 0, "done": 0, "embedded": 0, "written": 0}
+    created_at = datetime.utcnow()
+
+    async def read_and_split():
+        # 1) + 2) Pages are parsed and split off the event loop (process pool or thread)
+        batch = []  # (chunk_index, text, chunk)
+        chunk_index = 0
+        async for page_count, chunks in _split_pages(storage_key, source_path):
+            counts["pages"] += page_count
+            for chunk in chunks:
+                i, chunk_index = chunk_index, chunk_index + 1
+                text = _sanitize(chunk.page_content)
+                if not text:
+                    continue
+                batch.append((i, text, chunk))
+                counts["chunks"] += 1
+                if len(batch) >= batch_size:
+                    await batches.put(batch)
+                    batch = []
+        if batch:
+            await batches.put(batch)
+        for _ in range(embed_workers):
+            await batches.put(_DONE)
+
+    async def embed():
+        # 3) Reuse the live embedding of every chunk whose text did not change; the rest goes
+        # through the global dedup store, and only text never embedded before reaches Gemini
+        while True:
+            batch = await batches.get()
+            if batch is _DONE:
+                await row_batches.put(_DONE)
+                return
+            hashes = [text_hash(text) for _, text, _ in batch]
+            known = {}
+            if ingestion_settings.INGESTION_INCREMENTAL:
+                async with async_session_maker() as lookup_session:
+                    known = await load_live_embeddings(lookup_session, document_id, set(hashes))
+            to_embed = list(dict.fromkeys(
+                text for (_, text, _), h in zip(batch, hashes) if h not in known
+            ))
+            new_vectors = await embed_deduplicated(to_embed)
+            known.update((text_hash(text), vector) for text, vector in zip(to_embed, new_vectors))
+            counts["embedded"] += len(to_embed)
+
+            rows = []
+            for (i, text, chunk), content_hash in zip(batch, hashes):
+                # basic chunk metadata and indexes (explicit fallbacks so existing None values are replaced)
+                chunk_meta = dict(chunk.metadata or {})
+                chunk_meta["page"] = chunk_meta.get("page") or chunk_meta.get("page", None)
+                chunk_meta["source"] = chunk_meta.get("source") or storage_key
+                chunk_meta["s3_key"] = chunk_meta.get("s3_key") or storage_key
+                chunk_meta["splitter_start_index"] = chunk_meta.get("splitter_start_index") or getattr(chunk, "start_index", None)
+
+                rows.append({
+                    "id": uuid4(),
+                    "document_id": document_id,
+                    "generation": generation,
+                    "content": text,
+                    "content_hash": content_hash,
+                    "embedding": known[content_hash],
+                    "organization_id": organization_id,
+                    "metadata": chunk_meta,
+                    "chunk_index": i,
+                    "content_length": len(text),
+                    "created_at": created_at,
+                })
+            await row_batches.put(rows)
+            counts["done"] += len(batch)
+            if progress is not None:
+                await progress(counts["done"], counts["chunks"])
+
+    async def write():
+        # 4) Bulk-write (binary COPY) each batch as it arrives, one short transaction each
+        finished = 0
+        while finished < embed_workers:
+            rows = await row_batches.get()
+            if rows is _DONE:
+                finished += 1
+                continue
+            counts["written"] += await write_chunks(session, rows)
             await session.commit()
 
-    # Mark document as up-to-date after successful embedding
-    document.last_embedded_at = datetime.now()
-    session.add(document)
+    try:
+        async with asyncio.TaskGroup() as stages:
+            stages.create_task(read_and_split())
+            for _ in range(embed_workers):
+                stages.create_task(embed())
+            stages.create_task(write())
+    except BaseException as e:
+        await session.rollback()
+        await _discard_generation(session, document_id, generation)
+        if isinstance(e, BaseExceptionGroup) and len(e.exceptions) == 1:
+            # surface the stage's own error (it ends up in ingestion_jobs.last_error)
+            raise e.exceptions[0]
+        raise
+
+    if counts["pages"] == 0:
+        return {"document_id": str(document_id), "chunks": 0, "detail": "No pages extracted"}
+
+    if counts["written"] == 0 and await _has_live_chunks(session, document_id):
+        # pages without extractable text (scan, parse trouble): don't replace the live
+        # chunks with an empty generation
+        await _discard_generation(session, document_id, generation)
+        return {"document_id": str(document_id), "chunks": 0, "pages": counts["pages"],
+                "detail": "No text extracted, existing chunks kept"}
+
+    # Switch searches to the new chunks and drop the old ones, in one transaction;
+    # mark the document as up-to-date
+    embedded_at = datetime.now()
+    activated = await activate_generation(session, document_id, generation, embedded_at)
     await session.commit()
+    if not activated:
+        # a newer run for this document went live first; ours was dropped
+        return {"document_id": str(document_id), "chunks": 0, "pages": counts["pages"], "detail": "Superseded"}
 
     return {
-        "document_id": str(document.id),
-        "chunks": created,
-        "last_embedded_at": document.last_embedded_at.isoformat() if document.last_embedded_at else None,
+        "document_id": str(document_id),
+        "chunks": counts["written"],
+        "pages": counts["pages"],
+        "embedded": counts["embedded"],
+        "reused": counts["written"] - counts["embedded"],
+        "last_embedded_at": embedded_at.isoformat(),
         "detail": "Embedded and stored",
     }
+
+
+async def _has_live_chunks(session: AsyncSession, document_id: UUID) -> bool:
+    stmt = (
+        select(DocumentChunk.id)
+        .join(
+            Documents,
+            (DocumentChunk.document_id == Documents.id) & (DocumentChunk.generation == Documents.active_generation),
+        )
+        .where(DocumentChunk.document_id == document_id)
+        .limit(1)
+    )
+    return await session.scalar(stmt) is not None
+
+
+async def _discard_generation(session: AsyncSession, document_id: UUID, generation: int):
+    """Best-effort removal of a generation that will never be activated."""
+    try:
+        await session.execute(
+            delete(DocumentChunk).where(DocumentChunk.document_id == document_id, DocumentChunk.generation == generation),
+            execution_options={"synchronize_session": False},
+        )
+        await session.commit()
+    except Exception:
+        # left over rows are invisible and removed by the next successful swap
+        logger.warning("could not discard chunk generation %s of document %s", generation, document_id, exc_info=True)
@@ -0,0 +1,370 @@
+"""
+Persistent ingestion job queue backed by the ingestion_jobs table.
+
+The upload route only inserts a job row (enqueue_ingestion). Workers claim jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers (in the API process or in
+`python -m app.services.ingestion_queue`) can share one queue without double-processing.
+Failed jobs go back to the queue with exponential backoff until max_attempts is reached.
+"""
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from uuid import UUID
+import argparse
+import asyncio
+import logging
+import os
+import socket
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ingestion_settings
+from app.database.session import async_session_maker
+from app.models.documents import Documents
+from app.models.ingestion_jobs import IngestionJob, IngestionJobStatus
+from app.services.embedder import embedding_store
+from app.services.embeddings import process_and_embed_single_document
+from app.services.answer_cache import invalidate_organization
+from app.services.pdf_pages import shutdown_parse_executor
+from app.services.ingestion_spool import remove_spool, sweep_spool
+
+logger = logging.getLogger(__name__)
+
+
+async def enqueue_ingestion(session: AsyncSession, document: Documents, source_path: Optional[str] = None) -> IngestionJob:
+    """
+    Queue `document` for chunking + embedding and return the job row. `source_path` is
+    the upload's local spool copy (ingestion_spool), parsed instead of the stored object.
+    """
+    [job] = await enqueue_ingestion_many(session, [document], [source_path])
+    return job
+
+
+async def enqueue_ingestion_many(
+    session: AsyncSession,
+    documents: List[Documents],
+    source_paths: Optional[List[Optional[str]]] = None,
+) -> List[IngestionJob]:
+    """Queue several documents with one commit; jobs are returned in `documents` order."""
+    source_paths = source_paths or [None] * len(documents)
+    jobs = [
+        IngestionJob(
+            document_id=document.id,
+            organization_id=document.organization_id,
+            max_attempts=ingestion_settings.INGESTION_MAX_ATTEMPTS,
+            source_path=source_path,
+        )
+        for document, source_path in zip(documents, source_paths)
+    ]
+    session.add_all(jobs)
+    await session.commit()
+    return jobs
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt: base * 2^(attempts-1), capped."""
+    seconds = ingestion_settings.INGESTION_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, ingestion_settings.INGESTION_RETRY_MAX_SECONDS))
+
+
+def _new_session() -> AsyncSession:
+    return async_session_maker()
+
+
+async def claim_next_job(session: AsyncSession, worker_id: str) -> Optional[UUID]:
+    """
+    Atomically claim the oldest runnable job for `worker_id`.
+
+    Runnable = queued and due, or running with a stale heartbeat (its worker died).
+    SKIP LOCKED makes concurrent workers pass over rows another worker is claiming.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=ingestion_settings.INGESTION_STALE_AFTER_SECONDS)
+    next_job = (
+        select(IngestionJob.id)
+        .where(
+            or_(
+                and_(IngestionJob.status == IngestionJobStatus.QUEUED, IngestionJob.run_after <= now),
+                and_(IngestionJob.status == IngestionJobStatus.RUNNING, IngestionJob.heartbeat_at < stale_before),
+            )
+        )
+        .order_by(IngestionJob.run_after)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(IngestionJob)
+        .where(IngestionJob.id == next_job)
+        .values(
+            status=IngestionJobStatus.RUNNING,
+            attempts=IngestionJob.attempts + 1,
+            locked_by=worker_id,
+            heartbeat_at=now,
+            started_at=now,
+            finished_at=None,
+        )
+        .returning(IngestionJob.id)
+    )
+    result = await session.execute(stmt)
+    job_id = result.scalar_one_or_none()
+    await session.commit()
+    return job_id
+
+
+async def _report_progress(job_id: UUID, embedded: int, total: int):
+    async with _new_session() as session:
+        await session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id)
+            .values(
+                chunks_total=total,
+                # batches finish out of order; never move progress backwards
+                chunks_embedded=func.greatest(IngestionJob.chunks_embedded, embedded),
+                heartbeat_at=datetime.utcnow(),
+            )
+        )
+        await session.commit()
+
+
+async def _finish_job(job_id: UUID, invalidate_org_id: Optional[UUID] = None, **values):
+    async with _new_session() as session:
+        await session.execute(update(IngestionJob).where(IngestionJob.id == job_id).values(**values))
+        # new chunks are searchable from now on; answers cached before may be outdated
+        await invalidate_organization(session, invalidate_org_id)
+        await session.commit()
+
+
+async def run_job(job_id: UUID):
+    """Process one claimed job and record success, retry or failure."""
+    async with _new_session() as session:
+        job = await session.get(IngestionJob, job_id)
+        if job is None:
+            return
+        document = await session.get(Documents, job.document_id)
+        if document is None:
+            # document deleted while queued; the job row is cascaded away with it
+            return
+        # rollback() below expires the ORM objects; what the error path needs is read here
+        source_path = job.source_path
+        attempts, max_attempts = job.attempts, job.max_attempts
+        organization_id = document.organization_id
+        if attempts > max_attempts:
+            # reclaimed after its worker died on the last allowed attempt
+            remove_spool(source_path)
+            await _finish_job(
+                job_id,
+                status=IngestionJobStatus.FAILED,
+                last_error=job.last_error or "worker stopped while processing",
+                locked_by=None,
+                finished_at=datetime.utcnow(),
+            )
+            return
+
+        try:
+            result = await process_and_embed_single_document(
+                session,
+                document,
+                progress=lambda embedded, total: _report_progress(job_id, embedded, total),
+                source_path=source_path,
+            )
+        except Exception as e:
+            await session.rollback()
+            if attempts >= max_attempts:
+                logger.exception("ingestion job %s failed permanently after %s attempts", job_id, attempts)
+                remove_spool(source_path)
+                await _finish_job(
+                    job_id,
+                    status=IngestionJobStatus.FAILED,
+                    last_error=str(e),
+                    locked_by=None,
+                    finished_at=datetime.utcnow(),
+                )
+            else:
+                delay = retry_delay(attempts)
+                logger.warning("ingestion job %s attempt %s failed, retrying in %s: %s", job_id, attempts, delay, e)
+                await _finish_job(
+                    job_id,
+                    status=IngestionJobStatus.QUEUED,
+                    last_error=str(e),
+                    locked_by=None,
+                    run_after=datetime.utcnow() + delay,
+                )
+            return
+
+    remove_spool(source_path)
+    await _finish_job(
+        job_id,
+        invalidate_org_id=organization_id,
+        status=IngestionJobStatus.SUCCEEDED,
+        chunks_total=result.get("chunks", 0),
+        chunks_embedded=result.get("chunks", 0),
+        last_error=None,
+        locked_by=None,
+        finished_at=datetime.utcnow(),
+    )
+
+
+class IngestionWorkerPool:
+    """A set of asyncio tasks that poll the queue and run jobs until stopped."""
+
+    def __init__(self, workers: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.workers = ingestion_settings.INGESTION_WORKERS if workers is None else workers
+        self.poll_interval = poll_interval or ingestion_settings.INGESTION_POLL_INTERVAL
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def _worker(self, n: int):
+        worker_id = f"{self._prefix}:{n}"
+        while not self._stopping.is_set():
+            try:
+                async with _new_session() as session:
+                    job_id = await claim_next_job(session, worker_id)
+                if job_id is not None:
+                    await run_job(job_id)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # keep the worker alive on DB hiccups; the job (if any) is reclaimed when stale
+                logger.exception("ingestion worker %s crashed while polling", worker_id)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _sweeper(self):
+        # spool copies of jobs that will never run (document deleted, upload failed late)
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(sweep_spool)
+            except Exception:
+                logger.exception("ingestion spool sweep failed")
+            try:
+                await asyncio.wait_for(
+                    self._stopping.wait(), timeout=ingestion_settings.INGESTION_SPOOL_SWEEP_INTERVAL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self.workers:
+            self._tasks.append(asyncio.create_task(self._sweeper()))
+        for n in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(n)))
+
+    async def stop(self):
+        # running jobs are cancelled; they are picked up again once their heartbeat is stale
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+async def bulk_ingest(document_ids: List[UUID], workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Queue (re-)ingestion of many documents and process them in parallel until all are done.
+
+    `workers` documents run at once, each parsing in the shared process pool and embedding
+    through the shared embedder limits, so a backfill uses every core. Jobs go through the
+    normal queue (retries, progress, status endpoint); returns the final status counts.
+    Documents that already have a queued or running job are not queued again; their
+    existing job is waited for instead.
+    """
+    workers = workers or max(ingestion_settings.INGESTION_PARSE_PROCESSES, ingestion_settings.INGESTION_WORKERS, 1)
+    async with _new_session() as session:
+        unfinished = (await session.execute(
+            select(IngestionJob.id, IngestionJob.document_id)
+            .where(
+                IngestionJob.document_id.in_(document_ids),
+                IngestionJob.status.not_in(IngestionJobStatus.FINISHED),
+            )
+        )).all()
+        busy = {document_id for _, document_id in unfinished}
+        documents = (await session.execute(
+            select(Documents).where(Documents.id.in_(document_ids), Documents.id.not_in(busy))
+        )).scalars().all()
+        jobs = await enqueue_ingestion_many(session, list(documents))
+    job_ids = [job.id for job in jobs] + [job_id for job_id, _ in unfinished]
+    logger.info(
+        "bulk ingestion: %s documents queued, %s already in the queue, %s workers",
+        len(jobs), len(unfinished), workers,
+    )
+
+    pool = IngestionWorkerPool(workers=workers)
+    pool.start()
+    try:
+        while True:
+            async with _new_session() as session:
+                rows = await session.execute(
+                    select(IngestionJob.status, func.count())
+                    .where(IngestionJob.id.in_(job_ids))
+                    .group_by(IngestionJob.status)
+                )
+                counts = {status: n for status, n in rows.all()}
+            pending = sum(n for status, n in counts.items() if status not in IngestionJobStatus.FINISHED)
+            if not pending:
+                return counts
+            await asyncio.sleep(pool.poll_interval)
+    finally:
+        await pool.stop()
+
+
+async def _stale_document_ids(organization_id: Optional[UUID] = None) -> List[UUID]:
+    """Documents never embedded, or uploaded again since they were."""
+    stmt = select(Documents.id).where(
+        or_(Documents.last_embedded_at.is_(None), Documents.last_embedded_at < Documents.uploaded_at)
+    )
+    if organization_id is not None:
+        stmt = stmt.where(Documents.organization_id == organization_id)
+    async with _new_session() as session:
+        return list((await session.execute(stmt)).scalars().all())
+
+
+async def _run_forever():
+    pool = IngestionWorkerPool(workers=max(ingestion_settings.INGESTION_WORKERS, 1))
+    pool.start()
+    if embedding_store is not None:
+        embedding_store.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+        if embedding_store is not None:
+            await embedding_store.stop()
+
+
+async def _run_bulk(args):
+    if embedding_store is not None:
+        embedding_store.start()
+    try:
+        document_ids = [UUID(d) for d in args.document] or await _stale_document_ids(
+            UUID(args.organization) if args.organization else None
+        )
+        counts = await bulk_ingest(document_ids, workers=args.workers)
+        print(counts)
+    finally:
+        if embedding_store is not None:
+            await embedding_store.stop()
+        shutdown_parse_executor()
+
+
+if __name__ == "__main__":
+    # Standalone worker process: python -m app.services.ingestion_queue
+    # Bulk (re-)ingestion:       python -m app.services.ingestion_queue --bulk [--organization ID] [--document ID ...]
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bulk", action="store_true", help="ingest the given (default: all stale) documents, then exit")
+    parser.add_argument("--organization", help="with --bulk: only this organization's stale documents")
+    parser.add_argument("--document", action="append", default=[], help="with --bulk: document id (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="with --bulk: documents processed at once")
+    args = parser.parse_args()
+    if args.bulk:
+        asyncio.run(_run_bulk(args))
+    else:
+        try:
+            asyncio.run(_run_forever())
+        finally:
+            shutdown_parse_executor()
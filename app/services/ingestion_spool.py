@@ -0,0 +1,100 @@
+"""
+Local copies of uploaded PDFs for embed-on-upload.
+
+The upload routes tee the incoming file stream: every byte read for the storage upload is
+also written to a spool file on this host, whose path is recorded on the ingestion job
+(IngestionJob.source_path). Workers on the same host parse that file instead of reading
+the object back from S3; workers elsewhere, or jobs whose spool file is gone, fall back to
+storage. The spool file is removed when its job finishes, and the worker pool runs
+sweep_spool() periodically to clear leftovers (document deleted while queued, ...).
+
+Only processes running ingestion workers spool: an API started with INGESTION_WORKERS=0
+hands every job to other hosts, which could never read (or clean up) its copies.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+import io
+import logging
+import os
+import tempfile
+import time
+
+from app.config import ingestion_settings
+
+logger = logging.getLogger(__name__)
+
+
+class TeeReader(io.RawIOBase):
+    """
+    Non-seekable reader over `source` that copies everything read into `sink`.
+    Non-seekable on purpose: uploaders then read the stream once, front to back, instead
+    of seeking around to measure it (which would break the copy).
+    """
+
+    def __init__(self, source: BinaryIO, sink: BinaryIO):
+        super().__init__()
+        self._source = source
+        self._sink = sink
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._source.read(len(b))
+        self._sink.write(data)
+        b[:len(data)] = data
+        return len(data)
+
+
+def spool_dir() -> Path:
+    path = Path(ingestion_settings.INGESTION_SPOOL_DIR or Path(tempfile.gettempdir()) / "ingestion-spool")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def remove_spool(path: Optional[str]):
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def spooled(stream: BinaryIO, file_name: str) -> Iterator[Tuple[BinaryIO, Optional[str]]]:
+    """
+    Yield (stream to upload, spool path). Reading the stream to the end writes the spool
+    file; the path is None when the file is not ingested (or spooling is off). The spool
+    file is removed if the block fails; otherwise the caller hands it to the job.
+    """
+    if (
+        not ingestion_settings.INGESTION_SPOOL_ENABLED
+        or ingestion_settings.INGESTION_WORKERS <= 0
+        or not file_name.lower().endswith(".pdf")
+    ):
+        yield stream, None
+        return
+    fd, path = tempfile.mkstemp(dir=spool_dir(), suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as sink:
+            yield TeeReader(stream, sink), path
+    except BaseException:
+        remove_spool(path)
+        raise
+
+
+def sweep_spool(max_age: Optional[float] = None):
+    """Delete spool files older than `max_age` seconds (INGESTION_SPOOL_MAX_AGE_SECONDS)."""
+    max_age = ingestion_settings.INGESTION_SPOOL_MAX_AGE_SECONDS if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in spool_dir().glob("*.pdf"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        logger.info("removed %s stale ingestion spool files", removed)
@@ -0,0 +1,57 @@
+"""
+Bounded in-process cache of organization name -> id (and of ids known to exist) so
+/chat/ask does not query organizations before every question.
+
+Only found organizations are cached. The organization routes call `invalidate()` on create
+and delete; other API processes see a deletion once ORG_CACHE_TTL_SECONDS have passed.
+"""
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import organization_cache_settings
+from app.models.organization import Organization
+from app.utils.cache import TTLCache
+
+
+class OrganizationCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self._ids_by_name = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._known_ids = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def id_for_name(self, session: AsyncSession, name: str) -> Optional[UUID]:
+        org_id = self._ids_by_name.get(name)
+        if org_id is not None:
+            return org_id
+        result = await session.execute(select(Organization.id).where(Organization.organization_name == name))
+        org_id = result.scalar_one_or_none()
+        if org_id is not None:
+            self._ids_by_name.set(name, org_id)
+            self._known_ids.set(org_id, True)
+        return org_id
+
+    async def exists(self, session: AsyncSession, org_id: UUID) -> bool:
+        if self._known_ids.get(org_id):
+            return True
+        result = await session.execute(select(Organization.id).where(Organization.id == org_id))
+        if result.scalar_one_or_none() is None:
+            return False
+        self._known_ids.set(org_id, True)
+        return True
+
+    def invalidate(self, name: Optional[str] = None, org_id: Optional[UUID] = None):
+        if name is not None:
+            self._ids_by_name.pop(name)
+        if org_id is not None:
+            self._known_ids.pop(org_id)
+
+    def stats(self) -> dict:
+        return {"by_name": self._ids_by_name.stats(), "by_id": self._known_ids.stats()}
+
+
+organization_cache = OrganizationCache(
+    maxsize=organization_cache_settings.ORG_CACHE_SIZE,
+    ttl=organization_cache_settings.ORG_CACHE_TTL_SECONDS,
+)
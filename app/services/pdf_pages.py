@@ -0,0 +1,106 @@
+"""
+Page-at-a-time PDF text extraction for ingestion.
+
+Replaces PyPDFLoader(tmp_path).load(), which needed the whole file on disk and returned
+every page at once. Pages are yielded one by one from any seekable stream (storage.open,
+ranged S3 reads for stored documents), with the same text extraction (pypdf extract_text) and the page
+metadata the loader produced.
+
+Parsing and splitting are CPU-bound, so ingestion runs them in a process pool
+(get_parse_executor) on page ranges: count_pdf_pages / split_pdf_pages execute in the
+worker processes and only chunk text + metadata come back to the event loop. They read
+`source_path` (the upload's local spool copy) when given, the stored object otherwise.
+"""
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+from app.config import ingestion_settings
+from app.utils.storage import storage
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+
+def make_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True,
+    )
+
+
+def _page_document(reader: PdfReader, index: int, storage_key: str, labels: List[str]) -> Document:
+    # `labels` is reader.page_labels computed once: pypdf rebuilds every label per access
+    return Document(
+        page_content=reader.pages[index].extract_text().strip(),
+        metadata={
+            # ensure we always store both the S3 storage_key and the original filename
+            "source": storage_key,
+            "s3_key": storage_key,
+            # loader page numbers (0-based), with the 1-based fallback ingestion always applied
+            "page": index or index + 1,
+            "page_label": labels[index],
+            "total_pages": len(reader.pages),
+        },
+    )
+
+
+def iter_pdf_pages(stream: BinaryIO, storage_key: str) -> Iterator[Document]:
+    reader = PdfReader(stream)
+    labels = reader.page_labels
+    for index in range(len(reader.pages)):
+        yield _page_document(reader, index, storage_key, labels)
+
+
+def open_pdf_source(storage_key: str, source_path: Optional[str] = None) -> BinaryIO:
+    if source_path:
+        return open(source_path, "rb")
+    return storage.open(storage_key)
+
+
+def count_pdf_pages(storage_key: str, source_path: Optional[str] = None) -> int:
+    """Runs in a parse worker: number of pages of a stored PDF."""
+    with open_pdf_source(storage_key, source_path) as stream:
+        return len(PdfReader(stream).pages)
+
+
+def split_pdf_pages(storage_key: str, start: int, stop: int, source_path: Optional[str] = None) -> List[Tuple[str, dict]]:
+    """
+    Runs in a parse worker: extract pages [start, stop) of a stored PDF and split them.
+    Returns (chunk text, chunk metadata) pairs in document order; splitting page by page
+    gives the same chunks as splitting the whole document.
+    """
+    with open_pdf_source(storage_key, source_path) as stream:
+        reader = PdfReader(stream)
+        labels = reader.page_labels
+        pages = [_page_document(reader, index, storage_key, labels) for index in range(start, stop)]
+    return [(chunk.page_content, chunk.metadata) for chunk in make_splitter().split_documents(pages)]
+
+
+_parse_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Process pool for PDF parsing, created on first use; None when INGESTION_PARSE_PROCESSES is 0."""
+    global _parse_executor
+    if ingestion_settings.INGESTION_PARSE_PROCESSES <= 0:
+        return None
+    if _parse_executor is None:
+        _parse_executor = ProcessPoolExecutor(
+            max_workers=ingestion_settings.INGESTION_PARSE_PROCESSES,
+            # spawn: forking a process that already runs an event loop and thread pools is unsafe
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _parse_executor
+
+
+def shutdown_parse_executor():
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
@@ -1,23 +1,51 @@
 from typing import List, Dict, Any
-from sqlalchemy import select, bindparam, cast, Float
+from sqlalchemy import select, bindparam, cast, Float, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import vector_search_settings
 from app.models.documents import DocumentChunk, Documents
 from app.services.embedder import embed_text
 
 #return limit search top x result
 limit_results: int = 3
 
+
+async def apply_search_settings(session: AsyncSession):
+    """
+    Set pgvector query-time knobs for the current transaction only (set_config(..., true)
+    is SET LOCAL), in a single round-trip.
+    """
+    settings = {
+        "hnsw.ef_search": str(vector_search_settings.HNSW_EF_SEARCH),
+        "ivfflat.probes": str(vector_search_settings.IVFFLAT_PROBES),
+    }
+    if vector_search_settings.HNSW_ITERATIVE_SCAN:
+        settings["hnsw.iterative_scan"] = vector_search_settings.HNSW_ITERATIVE_SCAN
+
+    calls = ", ".join(f"set_config(:name_{i}, :value_{i}, true)" for i in range(len(settings)))
+    params = {}
+    for i, (name, value) in enumerate(settings.items()):
+        params[f"name_{i}"] = name
+        params[f"value_{i}"] = value
+    await session.execute(text(f"SELECT {calls}"), params)
+
 async def vector_search(
     org_id: str,
     query: str,
     session: AsyncSession | None = None,
+    query_embed: List[float] | None = None,
 ) -> List[Dict[str, Any]]:
     if session is None:
         raise RuntimeError("pass AsyncSession (SessionDep) to vector_search")
-    query_embed = await embed_text(query)  # same normalization as indexed vectors
+    if query_embed is None:
+        query_embed = await embed_text(query)  # same normalization as indexed vectors
 
     # build distance expression with SQLAlchemy operator (no raw SQL)
-    dist_expr = cast(DocumentChunk.embedding.op("<->")(bindparam("q")), Float)
+    # Vectors are L2-normalized on both sides, so negative inner product (<#>) ranks like
+    # cosine without the per-row norm computation. ORDER BY must be the bare expression,
+    # otherwise the HNSW (vector_ip_ops) index is not used.
+    order_expr = DocumentChunk.embedding.op("<#>")(bindparam("q"))
+    # report cosine distance (0 = identical): 1 - dot(a, b) == 1 + (a <#> b)
+    dist_expr = cast(1 + order_expr, Float)
     stmt = (
         select(
             DocumentChunk.id,
@@ -28,11 +56,16 @@ async def vector_search(
             Documents.file_name.label("file_name"),
             dist_expr.label("distance"),
         )
-        .join(Documents, DocumentChunk.document_id == Documents.id)
+        # only the live chunk generation; a re-embedding in progress stays invisible
+        .join(
+            Documents,
+            (DocumentChunk.document_id == Documents.id) & (DocumentChunk.generation == Documents.active_generation),
+        )
         .where(DocumentChunk.organization_id == org_id)
-        .order_by(dist_expr)
+        .order_by(order_expr)
         .limit(limit_results)
     )
+    await apply_search_settings(session)
     result = await session.execute(stmt, {"q": query_embed})
     rows = []
     for chunk in result.mappings().all():
@@ -0,0 +1,87 @@
+"""
+In-process cache of authenticated users for get_current_user.
+
+A verified bearer token maps to a compact, immutable snapshot of its user (CurrentUser), so
+hot users skip both the JWT verification and the users query for AUTH_USER_CACHE_TTL_SECONDS.
+Routes that change a user (organization created/deleted, deactivation) must call
+`user_cache.invalidate_user(user_id)`; other API processes pick the change up once their
+entries expire, so keep the TTL short.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+from uuid import UUID
+import threading
+import time
+
+from app.config import security_settings
+from app.models.user import User
+from app.utils.cache import TTLCache
+
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """What request handlers know about the caller; load User from the session to change it."""
+    id: UUID
+    username: str
+    email: str
+    full_name: Optional[str]
+    organization_id: Optional[UUID]
+    is_active: bool
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            organization_id=user.organization_id,
+            is_active=user.is_active,
+            is_admin=user.is_admin,
+        )
+
+
+class UserCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        # token -> (cached_at, token expiry as unix time, CurrentUser)
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        # user id -> when it was last invalidated; entries cached before that are stale
+        self._invalidated: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        item = self._entries.get(token)
+        if item is None:
+            return None
+        cached_at, token_exp, user = item
+        if time.time() >= token_exp or cached_at <= self._invalidated.get(user.id, 0.0):
+            self._entries.pop(token)
+            return None
+        return user
+
+    def set(self, token: str, user: CurrentUser, token_exp: Optional[float]):
+        if token_exp is None or self.ttl <= 0:
+            # tokens without exp are verified on every request; ttl 0 disables the cache
+            return
+        self._entries.set(token, (time.monotonic(), token_exp, user))
+
+    def invalidate_user(self, user_id: UUID):
+        """Forget every cached token of `user_id` (organization changed, deactivated, ...)."""
+        now = time.monotonic()
+        with self._lock:
+            self._invalidated[user_id] = now
+            # markers older than the TTL cannot match a live entry any more
+            expired = [uid for uid, at in self._invalidated.items() if at < now - self.ttl]
+            for uid in expired:
+                del self._invalidated[uid]
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+
+user_cache = UserCache(
+    maxsize=security_settings.AUTH_USER_CACHE_SIZE,
+    ttl=security_settings.AUTH_USER_CACHE_TTL_SECONDS,
+)
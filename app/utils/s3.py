@@ -1,13 +1,32 @@
+from collections import OrderedDict
 from datetime import datetime
+import io
 import logging
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from app.config import aws_settings
 
+MB = 1024 * 1024
+
 s3_client = boto3.client(
     "s3",
     aws_access_key_id=aws_settings.AWS_ACCESS_KEY_ID,
     aws_secret_access_key=aws_settings.AWS_SECRET_ACCESS_KEY,
     region_name=aws_settings.AWS_REGION,
+    config=Config(
+        # batch uploads run several multipart transfers at once, each with its own part threads
+        max_pool_connections=aws_settings.S3_MAX_POOL_CONNECTIONS,
+        retries={"max_attempts": aws_settings.S3_MAX_ATTEMPTS, "mode": aws_settings.S3_RETRY_MODE},
+        connect_timeout=aws_settings.S3_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=aws_settings.S3_READ_TIMEOUT_SECONDS,
+    ),
+)
+
+transfer_config = TransferConfig(
+    multipart_threshold=aws_settings.S3_MULTIPART_THRESHOLD_MB * MB,
+    multipart_chunksize=aws_settings.S3_MULTIPART_PART_SIZE_MB * MB,
+    max_concurrency=aws_settings.S3_MAX_CONCURRENCY,
 )
 
 # To create the bucket if it does not exist, if exist Comment out.
@@ -24,13 +43,18 @@ s3_client = boto3.client(
 
 def upload_file_to_s3(file_obj, filename, bucket=None):
     bucket = bucket or aws_settings.AWS_S3_BUCKET
-    s3_client.upload_fileobj(file_obj, bucket, filename)
+    s3_client.upload_fileobj(file_obj, bucket, filename, Config=transfer_config)
 
 def download_file_from_s3(filename, bucket=None):
     bucket = bucket or aws_settings.AWS_S3_BUCKET
     file_obj = s3_client.get_object(Bucket=bucket, Key=filename)
     return file_obj['Body'].read()
 
+def download_file_from_s3_to_path(filename, path, bucket=None):
+    """Download to a local file (parallel ranged GETs for large objects)."""
+    bucket = bucket or aws_settings.AWS_S3_BUCKET
+    s3_client.download_file(bucket, filename, path, Config=transfer_config)
+
 def delete_file_from_s3(filename, bucket=None):
     bucket = bucket or aws_settings.AWS_S3_BUCKET
     s3_client.delete_object(Bucket=bucket, Key=filename)
@@ -46,4 +70,123 @@ def file_exists_in_s3(filename, bucket=None):
             return False
         logging.error(f"S3 error checking file '{filename}': {e}")
         raise
-            
\ No newline at end of file
+
+
+def file_size_in_s3(filename, bucket=None):
+    """Object size in bytes, or None when it does not exist (one HEAD)."""
+    bucket = bucket or aws_settings.AWS_S3_BUCKET
+    try:
+        return s3_client.head_object(Bucket=bucket, Key=filename)["ContentLength"]
+    except s3_client.exceptions.ClientError as e:
+        if e.response['Error']['Code'] == "404":
+            return None
+        logging.error(f"S3 error checking file '{filename}': {e}")
+        raise
+
+
+def open_file_range_in_s3(filename, start, length, bucket=None):
+    """Streaming body over bytes [start, start + length); read it in pieces, then close()."""
+    bucket = bucket or aws_settings.AWS_S3_BUCKET
+    response = s3_client.get_object(Bucket=bucket, Key=filename, Range=f"bytes={start}-{start + length - 1}")
+    return response["Body"]
+
+
+def presigned_download_url(filename, download_name, expires_in, bucket=None):
+    """Time-limited GET URL that makes the client download the object straight from S3."""
+    bucket = bucket or aws_settings.AWS_S3_BUCKET
+    return s3_client.generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": bucket,
+            "Key": filename,
+            "ResponseContentDisposition": f"attachment; filename={download_name}",
+        },
+        ExpiresIn=expires_in,
+    )
+
+
+def list_keys_in_s3(prefix, bucket=None):
+    """Every key starting with `prefix`; one LIST per 1000 keys instead of a HEAD per key."""
+    bucket = bucket or aws_settings.AWS_S3_BUCKET
+    keys = set()
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        keys.update(item["Key"] for item in page.get("Contents", []))
+    return keys
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over an S3 object, fetched in `block_size` ranged GETs.
+    At most `max_blocks` blocks are kept (LRU), so memory does not grow with the object size.
+    Lets parsers that need random access (pypdf reads the xref table at the end first)
+    work without downloading the whole object to a temp file.
+    """
+
+    def __init__(self, key, bucket=None, block_size=1024 * 1024, max_blocks=8):
+        super().__init__()
+        self.bucket = bucket or aws_settings.AWS_S3_BUCKET
+        self.key = key
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.size = s3_client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        self.requests = 0
+        self._pos = 0
+        self._blocks = OrderedDict()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self._pos = pos
+        return pos
+
+    def _block(self, n):
+        block = self._blocks.get(n)
+        if block is not None:
+            self._blocks.move_to_end(n)
+            return block
+        start = n * self.block_size
+        end = min(start + self.block_size, self.size) - 1
+        response = s3_client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{end}")
+        block = response["Body"].read()
+        self.requests += 1
+        self._blocks[n] = block
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._pos
+        size = min(size, max(self.size - self._pos, 0))
+        parts = []
+        while size > 0:
+            n, offset = divmod(self._pos, self.block_size)
+            piece = self._block(n)[offset:offset + size]
+            if not piece:
+                break
+            parts.append(piece)
+            self._pos += len(piece)
+            size -= len(piece)
+        return b"".join(parts)
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
@@ -0,0 +1,201 @@
+"""
+Async document storage.
+
+Route handlers and ingestion go through `storage` instead of calling boto3 directly. Every
+blocking call runs on the storage's own bounded thread pool (STORAGE_THREAD_POOL_SIZE), so
+a long transfer never holds the event loop or the default executor that other requests use.
+
+Backends (STORAGE_BACKEND):
+- "s3": the shared S3 client from app.utils.s3 (pooled connections, multipart transfers,
+  botocore retries; see the S3_* settings)
+- "local": files under STORAGE_LOCAL_ROOT, for development and tests without AWS
+
+`open(key)` is synchronous on purpose: it returns a seekable binary file for parsers
+running in threads or in the parse worker processes. Downloads use `stream()`, which reads
+a byte range in STORAGE_STREAM_CHUNK_SIZE_KB pieces, so memory does not grow with the file.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional, Set
+import asyncio
+import functools
+import os
+import shutil
+import tempfile
+
+from app.config import aws_settings, storage_settings
+from app.utils import s3
+
+
+class S3Backend:
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+
+    def upload(self, file_obj: BinaryIO, key: str):
+        s3.upload_file_to_s3(file_obj, key, bucket=self.bucket)
+
+    def download(self, key: str) -> bytes:
+        return s3.download_file_from_s3(key, bucket=self.bucket)
+
+    def download_to_path(self, key: str, path: str):
+        s3.download_file_from_s3_to_path(key, path, bucket=self.bucket)
+
+    def exists(self, key: str) -> bool:
+        return s3.file_exists_in_s3(key, bucket=self.bucket)
+
+    def delete(self, key: str):
+        s3.delete_file_from_s3(key, bucket=self.bucket)
+
+    def size(self, key: str) -> Optional[int]:
+        return s3.file_size_in_s3(key, bucket=self.bucket)
+
+    def open_range(self, key: str, start: int, length: int):
+        return s3.open_file_range_in_s3(key, start, length, bucket=self.bucket)
+
+    def presigned_url(self, key: str, download_name: str, expires_in: int) -> Optional[str]:
+        return s3.presigned_download_url(key, download_name, expires_in, bucket=self.bucket)
+
+    def list_keys(self, prefix: str) -> Set[str]:
+        return s3.list_keys_in_s3(prefix, bucket=self.bucket)
+
+    def open(self, key: str) -> BinaryIO:
+        return s3.S3RangeReader(key, bucket=self.bucket)
+
+
+class LocalBackend:
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    def upload(self, file_obj: BinaryIO, key: str):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write next to the target and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(file_obj, out, 1024 * 1024)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def download(self, key: str) -> bytes:
+        return self._path(key).read_bytes()
+
+    def download_to_path(self, key: str, path: str):
+        shutil.copyfile(self._path(key), path)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+    def size(self, key: str) -> Optional[int]:
+        path = self._path(key)
+        return path.stat().st_size if path.is_file() else None
+
+    def open_range(self, key: str, start: int, length: int):
+        stream = self._path(key).open("rb")
+        stream.seek(start)
+        return stream
+
+    def presigned_url(self, key: str, download_name: str, expires_in: int) -> Optional[str]:
+        # nothing to redirect to; downloads are streamed through the API
+        return None
+
+    def list_keys(self, prefix: str) -> Set[str]:
+        return {
+            path.relative_to(self.root).as_posix()
+            for path in self.root.rglob("*")
+            if path.is_file() and not path.name.startswith(".upload-")
+            and path.relative_to(self.root).as_posix().startswith(prefix)
+        }
+
+    def open(self, key: str) -> BinaryIO:
+        return self._path(key).open("rb")
+
+
+class Storage:
+    """Async front for a storage backend; blocking calls run on a dedicated thread pool."""
+
+    def __init__(self, backend, *, thread_pool_size: int):
+        self.backend = backend
+        self.thread_pool_size = thread_pool_size
+        # created on first use: parse worker processes only ever call open()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.thread_pool_size, thread_name_prefix="storage")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def upload(self, file_obj: BinaryIO, key: str):
+        await self._run(self.backend.upload, file_obj, key)
+
+    async def download(self, key: str) -> bytes:
+        return await self._run(self.backend.download, key)
+
+    async def download_to_path(self, key: str, path: str):
+        """Copy `key` into the local file `path` without holding it in memory."""
+        await self._run(self.backend.download_to_path, key, path)
+
+    async def exists(self, key: str) -> bool:
+        return await self._run(self.backend.exists, key)
+
+    async def delete(self, key: str):
+        await self._run(self.backend.delete, key)
+
+    async def list_keys(self, prefix: str) -> Set[str]:
+        return await self._run(self.backend.list_keys, prefix)
+
+    async def size(self, key: str) -> Optional[int]:
+        """Size in bytes, None when `key` does not exist."""
+        return await self._run(self.backend.size, key)
+
+    async def presigned_url(self, key: str, download_name: str, expires_in: int) -> Optional[str]:
+        """Direct download URL, None when the backend cannot serve one."""
+        return await self._run(self.backend.presigned_url, key, download_name, expires_in)
+
+    async def stream(self, key: str, start: int, length: int, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Bytes [start, start + length) of `key`, at most `chunk_size` bytes per piece."""
+        chunk_size = chunk_size or storage_settings.STORAGE_STREAM_CHUNK_SIZE_KB * 1024
+        if length <= 0:
+            return
+        body = await self._run(self.backend.open_range, key, start, length)
+        try:
+            remaining = length
+            while remaining > 0:
+                chunk = await self._run(body.read, min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            # also runs when the client disconnects mid-download; frees the connection/file
+            body.close()
+
+    def open(self, key: str) -> BinaryIO:
+        return self.backend.open(key)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _make_backend():
+    if storage_settings.STORAGE_BACKEND == "local":
+        return LocalBackend(storage_settings.STORAGE_LOCAL_ROOT)
+    return S3Backend(aws_settings.AWS_S3_BUCKET)
+
+
+storage = Storage(_make_backend(), thread_pool_size=storage_settings.STORAGE_THREAD_POOL_SIZE)
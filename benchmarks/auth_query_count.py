@@ -0,0 +1,62 @@
+"""
+Query / row budget of the per-request user lookup (get_current_user -> get_user).
+
+Counts the SQL statements executed and the ORM objects loaded into the session while
+resolving one user, the way every authenticated request does. With selectin relationships
+this was 1 + 5 statements and pulled the organization's documents, chunks (with their
+768-dim embeddings) and audit logs; with lazy="raise" it must stay at 1 statement / 1 object.
+
+    python -m benchmarks.auth_query_count --username alice
+
+Needs the database from the usual POSTGRES_* settings and an existing user.
+Exits non-zero when the budget is exceeded, so it can be used as a smoke check.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from sqlalchemy import event
+
+from app.api.dependencies import get_user
+from app.database.session import async_session_maker, engine
+
+MAX_STATEMENTS = 1
+MAX_OBJECTS = 1
+
+
+async def main(args) -> int:
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _count)
+    try:
+        async with async_session_maker() as session:
+            started = time.perf_counter()
+            user = await get_user(session, username=args.username)
+            elapsed = time.perf_counter() - started
+            objects = len(session.identity_map)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _count)
+        await engine.dispose()
+
+    if user is None:
+        print(f"no user named {args.username!r}")
+        return 2
+    print(f"statements: {len(statements)}   objects loaded: {objects}   {elapsed * 1000:.1f} ms")
+    if args.verbose:
+        for statement in statements:
+            print("  " + " ".join(statement.split())[:160])
+    if len(statements) > MAX_STATEMENTS or objects > MAX_OBJECTS:
+        print(f"over budget: expected <= {MAX_STATEMENTS} statement(s) and <= {MAX_OBJECTS} object(s)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--verbose", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
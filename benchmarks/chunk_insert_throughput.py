@@ -0,0 +1,120 @@
+"""
+Throughput benchmark: writing document_chunks rows during ingestion.
+
+before: one DocumentChunk ORM object per chunk, session.add() + commit every 200 rows
+after:  app.services.chunk_writer (binary COPY with pgvector binary vectors; "insert" =
+        core insert() executemany batches)
+
+    python -m benchmarks.chunk_insert_throughput --chunks 50000
+
+Needs a Postgres with pgvector reachable through the usual POSTGRES_* settings. Rows go to a
+TEMP table shaped like document_chunks (it shadows the real one on the benchmark's single
+connection), so nothing is written to the real table. Pass --with-index to include the
+HNSW index in the temp table (much slower for every method, closer to production).
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import db_settings
+from app.models.documents import DocumentChunk
+from app.services.chunk_writer import copy_chunks, insert_chunks
+from app.services.embedder import EMBED_DIM
+
+SENTENCE = "Employees may carry over up to five unused vacation days into the next calendar year. "
+
+
+def synthetic_rows(n: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, EMBED_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    document_id, organization_id = uuid4(), uuid4()
+    created_at = datetime.utcnow()
+    content = (SENTENCE * 12)[:1000]
+    return [
+        {
+            "id": uuid4(),
+            "document_id": document_id,
+            "generation": 0,
+            "organization_id": organization_id,
+            "content": content,
+            "embedding": vectors[i].tolist(),
+            "metadata": {"page": i // 4 + 1, "source": "bench.pdf", "s3_key": "bench.pdf", "splitter_start_index": (i % 4) * 800},
+            "chunk_index": i,
+            "content_length": len(content),
+            "created_at": created_at,
+        }
+        for i in range(n)
+    ]
+
+
+async def write_orm(session: AsyncSession, rows):
+    # the pre-bulk ingestion loop
+    for n, row in enumerate(rows, start=1):
+        session.add(DocumentChunk(
+            id=row["id"],
+            document_id=row["document_id"],
+            content=row["content"],
+            embedding=row["embedding"],
+            organization_id=row["organization_id"],
+            raw_metadata=row["metadata"],
+            chunk_index=row["chunk_index"],
+            content_length=row["content_length"],
+            created_at=row["created_at"],
+        ))
+        if n % 200 == 0:
+            await session.commit()
+    await session.commit()
+
+
+async def write_insert(session: AsyncSession, rows):
+    await insert_chunks(session, rows, batch_size=1000)
+    await session.commit()
+
+
+async def write_copy(session: AsyncSession, rows):
+    await copy_chunks(session, rows, batch_size=1000)
+    await session.commit()
+
+
+METHODS = {"orm": write_orm, "insert": write_insert, "copy": write_copy}
+
+
+async def main(args):
+    # one connection, so the TEMP table is visible to every session
+    engine = create_async_engine(db_settings.POSTGRES_URL, pool_size=1, max_overflow=0)
+    make_session = async_sessionmaker(engine, expire_on_commit=False)
+    rows = synthetic_rows(args.chunks)
+    including = "INCLUDING DEFAULTS INCLUDING INDEXES" if args.with_index else "INCLUDING DEFAULTS"
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"CREATE TEMP TABLE document_chunks (LIKE public.document_chunks {including})"))
+
+        print(f"{args.chunks} chunks x {EMBED_DIM} dims{' (with HNSW index)' if args.with_index else ''}")
+        for name in args.methods:
+            async with engine.begin() as conn:
+                await conn.execute(text("TRUNCATE pg_temp.document_chunks"))
+            async with make_session() as session:
+                started = time.perf_counter()
+                await METHODS[name](session, rows)
+                elapsed = time.perf_counter() - started
+            async with engine.connect() as conn:
+                written = (await conn.execute(text("SELECT count(*) FROM pg_temp.document_chunks"))).scalar_one()
+            assert written == args.chunks, (name, written)
+            print(f"{name:<7} {elapsed:8.2f} s   {args.chunks / elapsed:10.0f} rows/s")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--methods", nargs="+", choices=list(METHODS), default=list(METHODS))
+    parser.add_argument("--with-index", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: per-request cost of reading token usage from an LLM result.
+
+before: llm_call kept {"raw": str(result)} and /chat/ask ran regexes over that string
+        (the removed _extract_tokens_from_metadata fallback)
+after:  typed LLMUsage read straight from AIMessage.usage_metadata / response_metadata
+
+    python -m benchmarks.token_usage_extraction [--answer-chars 8000] [--iterations 2000]
+
+Reports CPU time per request (timeit) and peak bytes allocated per request (tracemalloc).
+No network or database needed.
+"""
+import argparse
+import re
+import timeit
+import tracemalloc
+
+from langchain_core.messages import AIMessage
+
+from app.llm.base import _usage_from_message
+
+
+def _before(result) -> dict:
+    # what llm_call + _extract_tokens_from_metadata did on every request
+    metadata = {"raw": str(result), "llm_output": getattr(result, "llm_output", None)}
+    raw = metadata.get("raw", "") or ""
+
+    def _find_int(name: str):
+        m = re.search(rf"['\"]?{re.escape(name)}['\"]?\s*[:=]\s*(\d+)", raw)
+        return int(m.group(1)) if m else None
+
+    def _find_str(name: str):
+        m = re.search(rf"['\"]?{re.escape(name)}['\"]?\s*[:=]\s*['\"](?P<v>[^'\"]+)['\"]", raw)
+        if m:
+            return m.group("v")
+        m = re.search(rf"{re.escape(name)}\s*[:=]\s*([^\s,}}]+)", raw)
+        return m.group(1) if m else None
+
+    return {
+        "input_tokens": _find_int("input_tokens"),
+        "output_tokens": _find_int("output_tokens"),
+        "total_tokens": _find_int("total_tokens"),
+        "model_name": _find_str("model_name"),
+        "metadata": metadata,  # the raw dump stayed referenced for the rest of the request
+    }
+
+
+def _after(result):
+    return _usage_from_message(result)
+
+
+def _fake_result(answer_chars: int) -> AIMessage:
+    sentence = "The refund policy allows returns within thirty days of purchase. "
+    content = (sentence * (answer_chars // len(sentence) + 1))[:answer_chars]
+    return AIMessage(
+        content=content,
+        usage_metadata={"input_tokens": 1834, "output_tokens": answer_chars // 4, "total_tokens": 1834 + answer_chars // 4},
+        response_metadata={
+            "model_name": "gemini-2.5-flash",
+            "finish_reason": "STOP",
+            "safety_ratings": [{"category": f"HARM_CATEGORY_{i}", "probability": "NEGLIGIBLE"} for i in range(4)],
+        },
+    )
+
+
+def _peak_bytes(fn, result) -> int:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    kept = fn(result)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return peak
+
+
+def main(args):
+    result = _fake_result(args.answer_chars)
+    assert _before(result)["total_tokens"] == _after(result).total_tokens
+
+    print(f"answer size: {args.answer_chars} chars, {args.iterations} iterations")
+    for label, fn in (("before (str + regex)", _before), ("after (typed fields)", _after)):
+        seconds = min(timeit.repeat(lambda: fn(result), number=args.iterations, repeat=5)) / args.iterations
+        print(f"{label:<22} {seconds * 1e6:9.1f} us/request   peak {_peak_bytes(fn, result) / 1024:9.1f} KiB/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answer-chars", type=int, default=8000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    main(parser.parse_args())
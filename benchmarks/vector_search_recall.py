@@ -0,0 +1,127 @@
+"""
+Recall / latency benchmark: HNSW index vs exact search on a synthetic corpus.
+
+Loads a scratch table shaped like document_chunks (organization_id + 768-dim embedding),
+builds the same HNSW index as migrations/e91d6b7f40a2, then runs the vector_search query
+(filtered by organization, ORDER BY embedding <#> q LIMIT k) with the index disabled
+(exact) and enabled for several hnsw.ef_search values.
+
+    python -m benchmarks.vector_search_recall --rows 100000 --queries 200
+
+Needs a Postgres with pgvector reachable through the usual POSTGRES_* settings.
+The scratch table is dropped at the end unless --keep is passed.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import asyncpg
+import numpy as np
+from pgvector.asyncpg import register_vector
+
+from app.config import db_settings
+
+TABLE = "bench_document_chunks"
+
+
+def _dsn() -> str:
+    return (
+        f"postgresql://{db_settings.POSTGRES_USER}:{db_settings.POSTGRES_PASSWORD}"
+        f"@{db_settings.POSTGRES_SERVER}:{db_settings.POSTGRES_PORT}/{db_settings.POSTGRES_DB}"
+    )
+
+
+def synthetic_corpus(rows: int, dim: int, orgs: int, seed: int = 7):
+    """Clustered vectors (documents on a topic look alike) spread over `orgs` organizations."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(max(rows // 500, 1), dim)).astype(np.float32)
+    assignment = rng.integers(0, len(centroids), size=rows)
+    vectors = centroids[assignment] + 0.35 * rng.normal(size=(rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)  # stored chunks are L2-normalized
+    org_ids = rng.integers(0, orgs, size=rows)
+    return vectors, org_ids
+
+
+async def load(conn, vectors, org_ids, dim: int):
+    await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await conn.execute(f"CREATE TABLE {TABLE} (id bigint PRIMARY KEY, organization_id int NOT NULL, embedding vector({dim}) NOT NULL)")
+    records = ((i, int(org_ids[i]), vectors[i]) for i in range(len(vectors)))
+    started = time.perf_counter()
+    await conn.copy_records_to_table(TABLE, records=records, columns=["id", "organization_id", "embedding"])
+    print(f"loaded {len(vectors)} rows in {time.perf_counter() - started:.1f}s")
+
+    await conn.execute(f"CREATE INDEX ON {TABLE} (organization_id)")
+    started = time.perf_counter()
+    await conn.execute(f"CREATE INDEX ON {TABLE} USING hnsw (embedding vector_ip_ops) WITH (m = 16, ef_construction = 64)")
+    print(f"built hnsw index in {time.perf_counter() - started:.1f}s")
+    await conn.execute(f"ANALYZE {TABLE}")
+
+
+async def run_queries(conn, queries, query_orgs, k: int, settings: dict):
+    """Run every query in its own transaction with `settings` applied via SET LOCAL."""
+    results, latencies = [], []
+    sql = f"SELECT id FROM {TABLE} WHERE organization_id = $1 ORDER BY embedding <#> $2 LIMIT {k}"
+    for q, org in zip(queries, query_orgs):
+        async with conn.transaction():
+            for name, value in settings.items():
+                await conn.execute(f"SET LOCAL {name} = {value}")
+            started = time.perf_counter()
+            rows = await conn.fetch(sql, int(org), q)
+            latencies.append((time.perf_counter() - started) * 1000)
+        results.append({r["id"] for r in rows})
+    return results, latencies
+
+
+def _report(label: str, latencies, recall=None):
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    line = f"{label:<28} p50={statistics.median(latencies):7.2f}ms  p95={p95:7.2f}ms"
+    if recall is not None:
+        line += f"  recall@k={recall:.3f}"
+    print(line)
+
+
+async def main(args):
+    vectors, org_ids = synthetic_corpus(args.rows, args.dim, args.orgs)
+    rng = np.random.default_rng(11)
+    picks = rng.integers(0, args.rows, size=args.queries)
+    queries = vectors[picks] + 0.1 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    query_orgs = org_ids[picks]
+
+    conn = await asyncpg.connect(_dsn())
+    try:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        await register_vector(conn)
+        await load(conn, vectors, org_ids, args.dim)
+
+        exact, exact_latency = await run_queries(
+            conn, queries, query_orgs, args.k, {"enable_indexscan": "off", "enable_bitmapscan": "off"}
+        )
+        _report("exact (seq scan + sort)", exact_latency)
+
+        for ef in args.ef_search:
+            settings = {"hnsw.ef_search": ef}
+            if args.iterative_scan:
+                settings["hnsw.iterative_scan"] = args.iterative_scan
+            ann, ann_latency = await run_queries(conn, queries, query_orgs, args.k, settings)
+            recall = statistics.mean(len(a & e) / max(len(e), 1) for a, e in zip(ann, exact))
+            _report(f"hnsw ef_search={ef}", ann_latency, recall)
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--orgs", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200])
+    parser.add_argument("--iterative-scan", default="strict_order", help="'' for pgvector < 0.8")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch table")
+    asyncio.run(main(parser.parse_args()))
@@ -14,6 +14,9 @@ from app.config import db_settings
 from app.models.user import User
 from app.models.organization import Organization
 from app.models.documents import Documents
+from app.models.ingestion_jobs import IngestionJob
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.models.answer_cache import AnswerCacheEntry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,37 @@
+"""add embedding_cache table (shared query embedding cache tier)
+
+Revision ID: 4d2a8f1c7e35
+Revises: e91d6b7f40a2
+Create Date: 2026-10-18 15:20:54.118230
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision: str = '4d2a8f1c7e35'
+down_revision: Union[str, Sequence[str], None] = 'e91d6b7f40a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('embedding_cache',
+    sa.Column('model', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('dimension', sa.Integer(), nullable=False),
+    sa.Column('text_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('embedding', Vector(768), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(), nullable=False),
+    sa.PrimaryKeyConstraint('model', 'dimension', 'text_hash')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('embedding_cache')
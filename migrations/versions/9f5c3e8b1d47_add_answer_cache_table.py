@@ -0,0 +1,42 @@
+"""add answer_cache table (semantic /chat/ask answer cache)
+
+Revision ID: 9f5c3e8b1d47
+Revises: 4d2a8f1c7e35
+Create Date: 2026-10-18 16:48:12.640391
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision: str = '9f5c3e8b1d47'
+down_revision: Union[str, Sequence[str], None] = '4d2a8f1c7e35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('answer_cache',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('organization_id', sa.Uuid(), nullable=False),
+    sa.Column('question', sa.TEXT(), nullable=False),
+    sa.Column('question_embedding', Vector(768), nullable=False),
+    sa.Column('answer', sa.TEXT(), nullable=False),
+    sa.Column('sources', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', postgresql.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_answer_cache_organization_id'), 'answer_cache', ['organization_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_answer_cache_organization_id'), table_name='answer_cache')
+    op.drop_table('answer_cache')
@@ -0,0 +1,30 @@
+"""add ingestion_jobs.source_path (local upload copy)
+
+Revision ID: a8c4f1e7b250
+Revises: f4b8e2a6d913
+Create Date: 2026-10-18 21:42:13.507461
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c4f1e7b250'
+down_revision: Union[str, Sequence[str], None] = 'f4b8e2a6d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingestion_jobs', sa.Column('source_path', postgresql.TEXT(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ingestion_jobs', 'source_path')
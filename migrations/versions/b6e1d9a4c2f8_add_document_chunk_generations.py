@@ -0,0 +1,41 @@
+"""add chunk generations (atomic re-embedding swap)
+
+Revision ID: b6e1d9a4c2f8
+Revises: 9f5c3e8b1d47
+Create Date: 2026-10-18 18:05:37.218904
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1d9a4c2f8'
+down_revision: Union[str, Sequence[str], None] = '9f5c3e8b1d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('document_chunk_generation_seq')))
+    # existing chunks and documents both start at generation 0, so everything stays visible
+    op.add_column('documents', sa.Column('active_generation', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('document_chunks', sa.Column('generation', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_document_chunks_document_id_generation', 'document_chunks', ['document_id', 'generation'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # keep only the chunks searches were reading
+    op.execute(
+        "DELETE FROM document_chunks c USING documents d "
+        "WHERE c.document_id = d.id AND c.generation <> d.active_generation"
+    )
+    op.drop_index('ix_document_chunks_document_id_generation', table_name='document_chunks')
+    op.drop_column('document_chunks', 'generation')
+    op.drop_column('documents', 'active_generation')
+    op.execute(sa.schema.DropSequence(sa.Sequence('document_chunk_generation_seq')))
@@ -0,0 +1,30 @@
+"""add organizations.answer_cache_version
+
+Revision ID: c3e9a1d4f672
+Revises: a8c4f1e7b250
+Create Date: 2026-10-18 23:05:37.214093
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9a1d4f672'
+down_revision: Union[str, Sequence[str], None] = 'a8c4f1e7b250'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('organizations', sa.Column('answer_cache_version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('organizations', 'answer_cache_version')
@@ -0,0 +1,48 @@
+"""add HNSW index on document_chunks.embedding
+
+Revision ID: c3f8a2d5e914
+Revises: 7b1e4c9d2a63
+Create Date: 2026-10-18 11:03:27.814092
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a2d5e914'
+down_revision: Union[str, Sequence[str], None] = '7b1e4c9d2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # vector_l2_ops matches the <-> operator used by vector_search.
+    # CONCURRENTLY keeps document_chunks writable while the index builds (needs autocommit).
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_document_chunks_embedding_hnsw',
+            'document_chunks',
+            ['embedding'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_l2_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_document_chunks_embedding_hnsw',
+            table_name='document_chunks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
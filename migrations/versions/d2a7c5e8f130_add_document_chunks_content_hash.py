@@ -0,0 +1,32 @@
+"""add document_chunks.content_hash (incremental re-embedding)
+
+Revision ID: d2a7c5e8f130
+Revises: b6e1d9a4c2f8
+Create Date: 2026-10-18 18:42:09.517263
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c5e8f130'
+down_revision: Union[str, Sequence[str], None] = 'b6e1d9a4c2f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('document_chunks', sa.Column('content_hash', sa.VARCHAR(length=64), nullable=True))
+    # same hash the ingestion computes (sha256 hex of the stored text), so the first
+    # re-upload after this migration can already reuse embeddings
+    op.execute("UPDATE document_chunks SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('document_chunks', 'content_hash')
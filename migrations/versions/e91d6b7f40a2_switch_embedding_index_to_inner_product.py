@@ -0,0 +1,69 @@
+"""normalize stored embeddings and switch HNSW index to inner product
+
+Revision ID: e91d6b7f40a2
+Revises: c3f8a2d5e914
+Create Date: 2026-10-18 13:41:09.552871
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91d6b7f40a2'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a2d5e914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_document_chunks_embedding_hnsw',
+            table_name='document_chunks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    # vector_search ranks with <#>, which needs unit vectors. On large tables run
+    # `python -m app.services.backfill_embeddings` first; this then touches no rows.
+    op.execute(
+        "UPDATE document_chunks SET embedding = l2_normalize(embedding) "
+        "WHERE abs(vector_norm(embedding) - 1) > 1e-4"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_document_chunks_embedding_hnsw',
+            'document_chunks',
+            ['embedding'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_ip_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # normalized vectors stay normalized; only the index opclass goes back to L2
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_document_chunks_embedding_hnsw',
+            table_name='document_chunks',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.create_index(
+            'ix_document_chunks_embedding_hnsw',
+            'document_chunks',
+            ['embedding'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_l2_ops'},
+            postgresql_concurrently=True,
+        )
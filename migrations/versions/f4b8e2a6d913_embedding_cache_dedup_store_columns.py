@@ -0,0 +1,34 @@
+"""embedding_cache as global dedup store: last_used_at, hit_count
+
+Revision ID: f4b8e2a6d913
+Revises: d2a7c5e8f130
+Create Date: 2026-10-18 19:20:44.803126
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8e2a6d913'
+down_revision: Union[str, Sequence[str], None] = 'd2a7c5e8f130'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('embedding_cache', sa.Column('last_used_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=False))
+    op.add_column('embedding_cache', sa.Column('hit_count', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index(op.f('ix_embedding_cache_last_used_at'), 'embedding_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_embedding_cache_last_used_at'), table_name='embedding_cache')
+    op.drop_column('embedding_cache', 'hit_count')
+    op.drop_column('embedding_cache', 'last_used_at')
@@ -0,0 +1,75 @@
+"""
+Settings are read from the environment when app.config is imported, so placeholder values
+are set here first (real ones from the environment or .env still win). Nothing here talks to
+Postgres, S3 or an embedding API: storage is the local backend and embeddings are fake.
+"""
+import os
+import tempfile
+
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "JWT_SECRET": "test",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_TOKEN_EXPIRE_MINUTES": "30",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_REGION": "us-east-1",
+    "AWS_S3_BUCKET": "test",
+    "GEMINI_API_KEY": "test",
+    "LANGSMITH_API_KEY": "test",
+    "LANGSMITH_ENDPOINT": "http://localhost",
+    "LANGSMITH_PROJECT": "test",
+    "LANGSMITH_TRACING": "false",
+    "EMBEDDING_PROVIDER": "fake",
+    "STORAGE_BACKEND": "local",
+    "STORAGE_LOCAL_ROOT": os.path.join(tempfile.gettempdir(), "rag-test-storage"),
+}.items():
+    os.environ.setdefault(name, value)
+
+# the models import each other at module level; app.main loads them in a working order
+import app.main  # noqa: E402,F401
+
+import pytest  # noqa: E402
+
+
+def make_pdf(pages_text):
+    """Minimal PDF with one Helvetica text page per string (80 characters per line)."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages_text))), len(pages_text),
+        )).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages_text):
+        lines = [text[j:j + 80] for j in range(0, len(text), 80)]
+        content = ("BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({line}) Tj T*" for line in lines) + " ET").encode()
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        ).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    """Path of a 7-page PDF whose pages hold ~2500 characters each (several chunks per page)."""
+    words = [f"page{page}word{n:04d}" for page in range(7) for n in range(170)]
+    pages = [" ".join(words[page * 170:(page + 1) * 170]) for page in range(7)]
+    path = tmp_path / "sample.pdf"
+    path.write_bytes(make_pdf(pages))
+    return str(path)
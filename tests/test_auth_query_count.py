@@ -0,0 +1,69 @@
+"""
+Statement budget of the per-request user lookup (see benchmarks/auth_query_count.py, which
+measures the same thing against the real database). Runs on in-memory sqlite: the lookup
+only touches users and organizations.
+"""
+import asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.api.dependencies import get_user
+from app.models.organization import Organization
+from app.models.user import User
+
+MAX_STATEMENTS = 1
+MAX_OBJECTS = 1
+
+
+async def _lookup(username: str):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                SQLModel.metadata.create_all,
+                tables=[Organization.__table__, User.__table__],
+            )
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            org = Organization(organization_name="acme", created_by="alice")
+            session.add(org)
+            await session.flush()
+            session.add(User(
+                username="alice",
+                email="alice@example.com",
+                hashed_password="x",
+                organization_id=org.id,
+            ))
+            await session.commit()
+
+        statements = []
+
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _count)
+        try:
+            async with AsyncSession(engine) as session:
+                user = await get_user(session, username=username)
+                objects = len(session.identity_map)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", _count)
+        return user, statements, objects
+    finally:
+        await engine.dispose()
+
+
+def test_get_user_stays_within_budget():
+    user, statements, objects = asyncio.run(_lookup("alice"))
+
+    assert user is not None and user.username == "alice"
+    assert len(statements) <= MAX_STATEMENTS, statements
+    assert objects <= MAX_OBJECTS
+
+
+def test_get_user_unknown_name():
+    user, statements, _ = asyncio.run(_lookup("nobody"))
+
+    assert user is None
+    assert len(statements) <= MAX_STATEMENTS
@@ -0,0 +1,73 @@
+from datetime import datetime
+from uuid import uuid4
+import json
+import struct
+
+import numpy as np
+
+from app.services.chunk_writer import CHUNK_COLUMNS, _timestamp, _vector, encode_copy_rows
+
+
+def _fields(data: bytes):
+    """Decode PGCOPY binary tuples back into lists of raw field values (None for NULL)."""
+    rows, offset = [], 0
+    while offset < len(data):
+        (ncols,), offset = struct.unpack_from("!h", data, offset), offset + 2
+        row = []
+        for _ in range(ncols):
+            (length,), offset = struct.unpack_from("!i", data, offset), offset + 4
+            if length < 0:
+                row.append(None)
+                continue
+            row.append(data[offset:offset + length])
+            offset += length
+        rows.append(row)
+    return rows
+
+
+def test_vector_from_list_matches_numpy():
+    values = [0.5, -1.25, 3.0]
+
+    assert _vector(values) == _vector(np.array(values, dtype=np.float32))
+    assert _vector(values) == struct.pack("!hh", 3, 0) + np.array(values, dtype=">f4").tobytes()
+
+
+def test_timestamp_counts_microseconds_from_2000():
+    assert _timestamp(datetime(2000, 1, 1)) == struct.pack("!q", 0)
+    assert _timestamp(datetime(2000, 1, 2, 0, 0, 1, 5)) == struct.pack("!q", 86_401_000_005)
+
+
+def test_encode_copy_rows_in_column_order_with_nulls():
+    row = {
+        "id": uuid4(),
+        "document_id": uuid4(),
+        "generation": 7,
+        "organization_id": uuid4(),
+        "content": "héllo",
+        "content_hash": "abc",
+        "embedding": [1.0, 0.0],
+        "metadata": {"page": 2},
+        "chunk_index": None,
+        "content_length": 5,
+        "created_at": datetime(2024, 5, 1),
+    }
+
+    (fields,) = _fields(encode_copy_rows([row]))
+
+    assert len(fields) == len(CHUNK_COLUMNS)
+    by_name = dict(zip(CHUNK_COLUMNS, fields))
+    assert by_name["id"] == row["id"].bytes
+    assert by_name["generation"] == struct.pack("!q", 7)
+    assert by_name["content"] == "héllo".encode("utf-8")
+    assert by_name["metadata"][:1] == b"\x01"
+    assert json.loads(by_name["metadata"][1:]) == {"page": 2}
+    assert by_name["chunk_index"] is None
+    assert by_name["content_length"] == struct.pack("!i", 5)
+
+
+def test_encode_copy_rows_many():
+    rows = [{"content": str(i), "chunk_index": i} for i in range(3)]
+
+    decoded = _fields(encode_copy_rows(rows))
+
+    assert [dict(zip(CHUNK_COLUMNS, fields))["content"] for fields in decoded] == [b"0", b"1", b"2"]
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.routers.documents import _parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-19", (10, 19)),
+    ("bytes=990-2000", (990, 999)),   # end clamped to the file
+    ("bytes=500-", (500, 999)),       # open-ended
+    ("bytes=-100", (900, 999)),       # suffix: last 100 bytes
+    ("bytes=-5000", (0, 999)),        # suffix longer than the file
+])
+def test_single_ranges(header, expected):
+    assert _parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "items=0-10",
+    "bytes=0-10,20-30",   # multiple ranges: whole file
+    "bytes=abc-",
+    "bytes=-",
+    "bytes=20-10",        # last-pos before first-pos: invalid, ignored
+    "bytes=500-499",
+])
+def test_whole_file(header):
+    assert _parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-1000", "bytes=5000-6000"])
+def test_unsatisfiable(header):
+    with pytest.raises(HTTPException) as raised:
+        _parse_range(header, 1000)
+
+    assert raised.value.status_code == 416
+    assert raised.value.headers["Content-Range"] == "bytes */1000"
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.services.embedder import EMBED_DIM
+from app.services.embeddings import embed_in_batches
+
+
+class SlowFirstEmbedder:
+    """One-hot vector per text (index = the number in the text); earlier batches finish last."""
+
+    def __init__(self):
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def aembed_documents(self, texts):
+        self.batches.append(list(texts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            first = int(texts[0])
+            await asyncio.sleep(0.001 * (100 - first))
+        finally:
+            self.in_flight -= 1
+        vectors = []
+        for text in texts:
+            vector = [0.0] * EMBED_DIM
+            vector[int(text)] = 3.0
+            vectors.append(vector)
+        return vectors
+
+
+def _embed(texts, embedder, **kwargs):
+    return asyncio.run(embed_in_batches(texts, embedder, **kwargs))
+
+
+def test_vectors_keep_input_order_when_batches_finish_out_of_order():
+    texts = [str(i) for i in range(23)]
+    embedder = SlowFirstEmbedder()
+
+    vectors = _embed(texts, embedder, batch_size=4, max_concurrency=6)
+
+    assert [len(batch) for batch in embedder.batches] == [4, 4, 4, 4, 4, 3]
+    assert [vector.index(max(vector)) for vector in vectors] == list(range(23))
+    # normalized on the way out
+    assert all(max(vector) == pytest.approx(1.0) for vector in vectors)
+
+
+def test_concurrency_is_bounded():
+    embedder = SlowFirstEmbedder()
+
+    _embed([str(i) for i in range(40)], embedder, batch_size=2, max_concurrency=3)
+
+    assert embedder.max_in_flight == 3
+
+
+def test_on_batch_done_reports_every_text():
+    done = []
+
+    async def on_batch_done(n):
+        done.append(n)
+
+    _embed([str(i) for i in range(10)], SlowFirstEmbedder(), batch_size=4, max_concurrency=2, on_batch_done=on_batch_done)
+
+    assert sorted(done) == [2, 4, 4]
+
+
+def test_empty_input():
+    assert _embed([], SlowFirstEmbedder(), batch_size=4, max_concurrency=2) == []
+
+
+def test_rejects_invalid_limits():
+    with pytest.raises(ValueError):
+        _embed(["0"], SlowFirstEmbedder(), batch_size=1, max_concurrency=-1)
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from app.config import ingestion_settings
+from app.models.documents import Documents
+from app.models.ingestion_jobs import IngestionJob, IngestionJobStatus
+from app.models.organization import Organization
+from app.services import ingestion_queue
+from app.services.ingestion_queue import retry_delay, run_job
+
+
+def test_retry_delay_doubles_per_attempt(monkeypatch):
+    monkeypatch.setattr(ingestion_settings, "INGESTION_RETRY_BASE_SECONDS", 10)
+    monkeypatch.setattr(ingestion_settings, "INGESTION_RETRY_MAX_SECONDS", 1000)
+
+    assert [retry_delay(n).total_seconds() for n in (1, 2, 3, 4)] == [10, 20, 40, 80]
+
+
+def test_retry_delay_is_capped(monkeypatch):
+    monkeypatch.setattr(ingestion_settings, "INGESTION_RETRY_BASE_SECONDS", 10)
+    monkeypatch.setattr(ingestion_settings, "INGESTION_RETRY_MAX_SECONDS", 60)
+
+    assert retry_delay(30) == timedelta(seconds=60)
+
+
+def test_retry_delay_before_first_attempt(monkeypatch):
+    monkeypatch.setattr(ingestion_settings, "INGESTION_RETRY_BASE_SECONDS", 10)
+
+    assert retry_delay(0) == timedelta(seconds=10)
+
+
+async def _run_failing_job(monkeypatch, attempts: int, max_attempts: int):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                SQLModel.metadata.create_all,
+                tables=[Organization.__table__, Documents.__table__, IngestionJob.__table__],
+            )
+        async with session_maker() as session:
+            org = Organization(organization_name="acme")
+            session.add(org)
+            await session.flush()
+            document = Documents(file_name="a.pdf", upload_by="alice", organization_id=org.id, storage_key="acme_a.pdf")
+            session.add(document)
+            await session.flush()
+            job = IngestionJob(
+                document_id=document.id,
+                organization_id=org.id,
+                status=IngestionJobStatus.RUNNING,
+                attempts=attempts,
+                max_attempts=max_attempts,
+                locked_by="worker-1",
+            )
+            session.add(job)
+            await session.commit()
+
+        async def failing_pipeline(session, document, progress=None, source_path=None):
+            # fail inside an open transaction, like a DB error halfway through the write
+            await session.execute(text("SELECT 1"))
+            raise RuntimeError("embedding API unavailable")
+
+        monkeypatch.setattr(ingestion_queue, "_new_session", session_maker)
+        monkeypatch.setattr(ingestion_queue, "process_and_embed_single_document", failing_pipeline)
+        started = datetime.utcnow()
+        await run_job(job.id)
+
+        async with session_maker() as session:
+            return started, await session.get(IngestionJob, job.id)
+    finally:
+        await engine.dispose()
+
+
+def test_failed_attempt_is_requeued_with_backoff(monkeypatch):
+    monkeypatch.setattr(ingestion_settings, "INGESTION_RETRY_BASE_SECONDS", 10)
+
+    started, job = asyncio.run(_run_failing_job(monkeypatch, attempts=2, max_attempts=5))
+
+    assert job.status == IngestionJobStatus.QUEUED
+    assert job.last_error == "embedding API unavailable"
+    assert job.locked_by is None
+    assert job.run_after >= started + timedelta(seconds=20)
+
+
+def test_last_attempt_fails_the_job(monkeypatch):
+    _, job = asyncio.run(_run_failing_job(monkeypatch, attempts=5, max_attempts=5))
+
+    assert job.status == IngestionJobStatus.FAILED
+    assert job.last_error == "embedding API unavailable"
+    assert job.finished_at is not None
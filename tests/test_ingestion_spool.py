@@ -0,0 +1,79 @@
+import io
+import os
+import shutil
+import time
+
+import pytest
+
+from app.config import ingestion_settings
+from app.services.ingestion_spool import TeeReader, spooled, sweep_spool
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion_settings, "INGESTION_SPOOL_ENABLED", True)
+    monkeypatch.setattr(ingestion_settings, "INGESTION_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(ingestion_settings, "INGESTION_WORKERS", 2)
+    return tmp_path / "spool"
+
+
+def test_tee_reader_copies_what_is_read():
+    data = os.urandom(300_000)
+    sink, out = io.BytesIO(), io.BytesIO()
+    reader = TeeReader(io.BytesIO(data), sink)
+
+    shutil.copyfileobj(reader, out, 64 * 1024)
+
+    assert out.getvalue() == data
+    assert sink.getvalue() == data
+    assert not reader.seekable()
+
+
+def test_spooled_keeps_the_copy_on_success(spool):
+    data = os.urandom(10_000)
+
+    with spooled(io.BytesIO(data), "report.PDF") as (stream, path):
+        assert stream.read() == data
+
+    assert path is not None and os.path.dirname(path) == str(spool)
+    with open(path, "rb") as copy:
+        assert copy.read() == data
+
+
+def test_spooled_removes_the_copy_on_failure(spool):
+    with pytest.raises(RuntimeError):
+        with spooled(io.BytesIO(b"%PDF-1.4"), "report.pdf") as (stream, path):
+            stream.read()
+            raise RuntimeError("upload failed")
+
+    assert not os.path.exists(path)
+    assert list(spool.iterdir()) == []
+
+
+@pytest.mark.parametrize("file_name, setting, value", [
+    ("notes.txt", None, None),
+    ("report.pdf", "INGESTION_SPOOL_ENABLED", False),
+    ("report.pdf", "INGESTION_WORKERS", 0),
+])
+def test_spooled_passes_the_stream_through(spool, monkeypatch, file_name, setting, value):
+    if setting is not None:
+        monkeypatch.setattr(ingestion_settings, setting, value)
+    source = io.BytesIO(b"data")
+
+    with spooled(source, file_name) as (stream, path):
+        assert stream is source
+        assert path is None
+
+
+def test_sweep_spool_removes_old_files_only(spool):
+    with spooled(io.BytesIO(b"old"), "old.pdf") as (stream, old_path):
+        stream.read()
+    with spooled(io.BytesIO(b"new"), "new.pdf") as (stream, new_path):
+        stream.read()
+    an_hour_ago = time.time() - 3600
+    os.utime(old_path, (an_hour_ago, an_hour_ago))
+
+    sweep_spool(max_age=60)
+
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path)
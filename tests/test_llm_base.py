@@ -0,0 +1,108 @@
+import asyncio
+
+from langchain_core.messages import AIMessageChunk
+
+from app.config import llm_settings
+from app.llm import base
+from app.llm.base import ConcurrencyLimiter
+
+
+async def _run(limiter, calls):
+    running = {"now": 0, "max": 0, "per_key_max": {}}
+    active = {}
+
+    async def call(key):
+        async with limiter.slot(key):
+            running["now"] += 1
+            active[key] = active.get(key, 0) + 1
+            running["max"] = max(running["max"], running["now"])
+            running["per_key_max"][key] = max(running["per_key_max"].get(key, 0), active[key])
+            await asyncio.sleep(0.01)
+            active[key] -= 1
+            running["now"] -= 1
+
+    await asyncio.gather(*(call(key) for key in calls))
+    return running
+
+
+def test_global_and_per_key_caps():
+    limiter = ConcurrencyLimiter(global_limit=3, per_key_limit=2)
+
+    running = asyncio.run(_run(limiter, ["a"] * 6 + ["b"] * 6 + [None] * 3))
+
+    assert running["max"] == 3
+    assert running["per_key_max"]["a"] == 2
+    assert running["per_key_max"]["b"] == 2
+
+
+def test_idle_keys_are_forgotten():
+    limiter = ConcurrencyLimiter(global_limit=4, per_key_limit=1)
+
+    asyncio.run(_run(limiter, [f"org-{i}" for i in range(50)] + ["org-0"] * 3))
+
+    assert limiter._per_key == {}
+
+
+def test_cancelled_waiter_releases_its_key():
+    limiter = ConcurrencyLimiter(global_limit=4, per_key_limit=1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def holder():
+            async with limiter.slot("a"):
+                await release.wait()
+
+        held = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_run(limiter, ["a"]))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter._per_key["a"][1] == 1
+        release.set()
+        await held
+
+    asyncio.run(scenario())
+
+    assert limiter._per_key == {}
+
+
+class StallingModel:
+    """astream yields `chunks` then hangs, like an upstream that stopped sending."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def astream(self, messages, **kwargs):
+        try:
+            for chunk in self.chunks:
+                yield chunk
+            await asyncio.sleep(3600)
+        finally:
+            self.closed = True
+
+
+def test_stalled_stream_times_out_and_frees_its_slots(monkeypatch):
+    model = StallingModel([AIMessageChunk(content="Hel"), AIMessageChunk(content="lo")])
+    limiter = ConcurrencyLimiter(global_limit=1, per_key_limit=1)
+    monkeypatch.setattr(base, "llm", model)
+    monkeypatch.setattr(base, "llm_limiter", limiter)
+    monkeypatch.setattr(llm_settings, "LLM_TOTAL_TIMEOUT_SECONDS", 0.05)
+
+    async def consume():
+        tokens = []
+        try:
+            async for event in base.llm_stream("question", org_id="org-1"):
+                tokens.append(event["text"])
+        except TimeoutError:
+            return tokens, "timeout"
+        return tokens, "done"
+
+    tokens, outcome = asyncio.run(asyncio.wait_for(consume(), timeout=5))
+
+    assert (tokens, outcome) == (["Hel", "lo"], "timeout")
+    assert model.closed
+    assert limiter._per_key == {}
+    assert not limiter._global.locked()
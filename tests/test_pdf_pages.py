@@ -0,0 +1,74 @@
+import asyncio
+
+from app.config import ingestion_settings
+from app.services import embeddings, pdf_pages
+from app.services.ingestion_spool import spool_dir
+from app.services.pdf_pages import count_pdf_pages, iter_pdf_pages, make_splitter, split_pdf_pages
+from app.utils.storage import storage
+
+
+def _pairs(documents):
+    return [(document.page_content, document.metadata) for document in documents]
+
+
+def _single_split(path):
+    with open(path, "rb") as stream:
+        return _pairs(make_splitter().split_documents(list(iter_pdf_pages(stream, "org_sample.pdf"))))
+
+
+def test_page_ranges_give_the_same_chunks_as_one_split(pdf_path):
+    expected = _single_split(pdf_path)
+    total = count_pdf_pages("org_sample.pdf", pdf_path)
+
+    for step in (1, 2, 3, total):
+        chunks = []
+        for start in range(0, total, step):
+            chunks += split_pdf_pages("org_sample.pdf", start, min(start + step, total), pdf_path)
+        assert chunks == expected, f"pages per range: {step}"
+    assert total == 7
+    assert len(expected) > total
+
+
+def test_page_metadata(pdf_path):
+    with open(pdf_path, "rb") as stream:
+        pages = list(iter_pdf_pages(stream, "org_sample.pdf"))
+
+    assert [page.metadata["page_label"] for page in pages] == [str(n) for n in range(1, 8)]
+    assert [page.metadata["page"] for page in pages] == [1, 1, 2, 3, 4, 5, 6]
+    assert {page.metadata["total_pages"] for page in pages} == {7}
+    assert pages[3].page_content.startswith("page3word0000")
+
+
+async def _collect(storage_key, source_path=None):
+    chunks = []
+    async for _, page_chunks in embeddings._split_pages(storage_key, source_path):
+        chunks += _pairs(page_chunks)
+    return chunks
+
+
+def test_process_pool_split_matches_in_process_split(pdf_path, monkeypatch):
+    key = "test_pool_sample.pdf"
+    with open(pdf_path, "rb") as stream:
+        storage.backend.upload(stream, key)
+    spooled_before = set(spool_dir().glob("*.pdf"))
+
+    monkeypatch.setattr(ingestion_settings, "INGESTION_PARSE_PROCESSES", 0)
+    in_process = asyncio.run(_collect(key))
+
+    monkeypatch.setattr(ingestion_settings, "INGESTION_PARSE_PROCESSES", 2)
+    monkeypatch.setattr(ingestion_settings, "INGESTION_PARSE_PAGES_PER_TASK", 2)
+    try:
+        # ranged reads of the stored object, an upload spool file, and the opt-in local copy
+        pooled = asyncio.run(_collect(key))
+        pooled_from_spool = asyncio.run(_collect(key, pdf_path))
+        monkeypatch.setattr(ingestion_settings, "INGESTION_PARSE_LOCAL_COPY", True)
+        pooled_from_copy = asyncio.run(_collect(key))
+    finally:
+        pdf_pages.shutdown_parse_executor()
+        storage.backend.delete(key)
+
+    assert pooled == in_process
+    assert pooled_from_spool == in_process
+    assert pooled_from_copy == in_process
+    # the per-job local copy is removed afterwards
+    assert set(spool_dir().glob("*.pdf")) == spooled_before
@@ -0,0 +1,68 @@
+import asyncio
+import io
+
+import pytest
+
+from app.utils.storage import LocalBackend, Storage
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return LocalBackend(str(tmp_path / "root"))
+
+
+@pytest.mark.parametrize("key", ["../escape.pdf", "a/../../escape.pdf", "/etc/passwd"])
+def test_keys_outside_the_root_are_rejected(backend, key):
+    with pytest.raises(ValueError):
+        backend.upload(io.BytesIO(b"x"), key)
+    with pytest.raises(ValueError):
+        backend.open(key)
+    with pytest.raises(ValueError):
+        backend.delete(key)
+    assert not (backend.root.parent / "escape.pdf").exists()
+
+
+def test_round_trip(backend, tmp_path):
+    backend.upload(io.BytesIO(b"hello"), "org/doc.pdf")
+
+    assert backend.exists("org/doc.pdf")
+    assert backend.size("org/doc.pdf") == 5
+    assert backend.download("org/doc.pdf") == b"hello"
+    assert backend.list_keys("org/") == {"org/doc.pdf"}
+    backend.download_to_path("org/doc.pdf", str(tmp_path / "copy.pdf"))
+    assert (tmp_path / "copy.pdf").read_bytes() == b"hello"
+
+    backend.delete("org/doc.pdf")
+    assert not backend.exists("org/doc.pdf")
+    assert backend.size("org/doc.pdf") is None
+
+
+def test_failed_upload_leaves_no_partial_file(backend):
+    class Broken(io.RawIOBase):
+        def readable(self):
+            return True
+
+        def readinto(self, b):
+            raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        backend.upload(Broken(), "doc.pdf")
+
+    assert not backend.exists("doc.pdf")
+    assert list(backend.root.iterdir()) == []
+
+
+def test_stream_reads_the_range_in_chunks(backend):
+    backend.upload(io.BytesIO(bytes(range(100))), "doc.pdf")
+    storage = Storage(backend, thread_pool_size=2)
+
+    async def collect():
+        return [chunk async for chunk in storage.stream("doc.pdf", 10, 25, chunk_size=10)]
+
+    try:
+        chunks = asyncio.run(collect())
+    finally:
+        storage.shutdown()
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert b"".join(chunks) == bytes(range(10, 35))
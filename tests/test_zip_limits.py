@@ -0,0 +1,44 @@
+import io
+import os
+import zipfile
+
+from app.api.v1.routers.documents import _zip_entry_problem
+from app.config import upload_settings
+
+MB = 1024 * 1024
+
+
+def _entry(data: bytes) -> zipfile.ZipInfo:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("doc.pdf", data)
+    with zipfile.ZipFile(buffer) as archive:
+        return archive.getinfo("doc.pdf")
+
+
+def test_entry_within_limits():
+    assert _zip_entry_problem(_entry(os.urandom(4096)), unpacked=0) is None
+
+
+def test_high_compression_ratio_is_refused(monkeypatch):
+    monkeypatch.setattr(upload_settings, "UPLOAD_ZIP_MAX_RATIO", 100)
+
+    problem = _zip_entry_problem(_entry(b"\0" * (2 * MB)), unpacked=0)
+
+    assert problem is not None and "ratio" in problem
+
+
+def test_large_entry_is_refused(monkeypatch):
+    monkeypatch.setattr(upload_settings, "UPLOAD_ZIP_MAX_ENTRY_MB", 1)
+
+    problem = _zip_entry_problem(_entry(os.urandom(MB + 1)), unpacked=0)
+
+    assert problem is not None and "1 MB" in problem
+
+
+def test_archive_total_is_refused(monkeypatch):
+    monkeypatch.setattr(upload_settings, "UPLOAD_ZIP_MAX_TOTAL_MB", 1)
+    info = _entry(os.urandom(4096))
+
+    assert _zip_entry_problem(info, unpacked=MB - 4096) is None
+    assert "Archive exceeds" in _zip_entry_problem(info, unpacked=MB - 4095)